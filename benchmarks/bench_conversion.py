@@ -0,0 +1,123 @@
+"""
+Benchmark: per-file `soffice` subprocess vs the persistent LibreOffice conversion service.
+
+Usage (from the repo root):
+    python -m benchmarks.bench_conversion --count 20 --instances 2 [--xlsx path/to/PAYSLIP_TEMPLATE.xlsx]
+
+Both backends convert --instances documents at once: the subprocess backend with one converter
+(and LibreOffice profile) per thread, as quick mode does, the service with --instances instances.
+Prints one JSON object with the timings of each backend.
+"""
+
+import argparse
+import json
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from queue import Queue
+
+from src.services.pdf_conversion import LibreOfficeService, SubprocessConverter, uno_available
+
+
+def sample_spreadsheet(path: Path):
+    from openpyxl import Workbook
+
+    wb = Workbook()
+    ws = wb.active
+    ws["A1"] = "Zedulo payslip conversion benchmark"
+    for row in range(3, 40):
+        ws.cell(row=row, column=1, value=f"Line {row}")
+        ws.cell(row=row, column=3, value=row * 1000.5)
+    wb.save(path)
+
+
+def run_backend(converters, spreadsheets):
+    """Converts `spreadsheets` with one thread per converter, each conversion borrowing an idle converter."""
+    workers = len(converters)
+    idle = Queue()
+    for converter in converters:
+        idle.put(converter)
+
+    def timed_convert(spreadsheet):
+        converter = idle.get()
+        try:
+            t0 = time.perf_counter()
+            ok = converter.convert(spreadsheet) is not None
+            return ok, time.perf_counter() - t0
+        finally:
+            idle.put(converter)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        outcomes = list(pool.map(timed_convert, spreadsheets))
+    total = time.perf_counter() - started
+
+    return {
+        "documents"   : len(spreadsheets),
+        "workers"     : workers,
+        "failures"    : sum(1 for ok, _ in outcomes if not ok),
+        "total_s"     : round(total, 3),
+        "per_doc_s"   : round(total / max(1, len(spreadsheets)), 3),
+        "max_doc_s"   : round(max((t for _, t in outcomes), default=0), 3),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--count", type=int, default=20, help="documents converted per backend")
+    parser.add_argument("--instances", type=int, default=2, help="conversions at once, for both backends")
+    parser.add_argument("--xlsx", help="spreadsheet to convert (defaults to a generated sample)")
+    args = parser.parse_args(argv)
+
+    workdir = Path(tempfile.mkdtemp(prefix="zedulo_bench_"))
+    try:
+        source = workdir / "source.xlsx"
+        if args.xlsx:
+            shutil.copy2(args.xlsx, source)
+        else:
+            sample_spreadsheet(source)
+
+        results = {"count": args.count, "instances": args.instances}
+
+        for backend in ("subprocess", "service"):
+            backend_dir = workdir / backend
+            backend_dir.mkdir()
+            spreadsheets = []
+            for i in range(args.count):
+                spreadsheets.append(backend_dir / f"payslip_{i}.xlsx")
+                shutil.copy2(source, spreadsheets[-1])
+
+            if backend == "subprocess":
+                converters = [SubprocessConverter() for _ in range(args.instances)]
+                try:
+                    results[backend] = run_backend(converters, spreadsheets)
+                finally:
+                    for converter in converters:
+                        converter.close()
+                continue
+
+            if not uno_available():
+                results[backend] = {"skipped": "python3-uno is not importable"}
+                continue
+
+            t0 = time.perf_counter()
+            service = LibreOfficeService(instances=args.instances)
+            startup = time.perf_counter() - t0
+            try:
+                # Thread-safe: one entry per thread, each call borrows one of its instances
+                results[backend] = run_backend([service] * args.instances, spreadsheets)
+                results[backend]["startup_s"] = round(startup, 3)
+            finally:
+                service.close()
+
+        json.dump(results, sys.stdout, indent=4)
+        print()
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
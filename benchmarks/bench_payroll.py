@@ -0,0 +1,267 @@
+"""
+Benchmark: where the time of a payroll run goes, stage by stage.
+
+Builds a synthetic employee workbook (N employees x M month sheets, APP_CONFIG header names)
+and a sample payslip template, then runs each month through PayslipGenerator's stages:
+
+    load     open the workbook, read the month sheet
+    tax      validate rows and compute PAYE/SSF
+    ytd      write the month's YTD records and read the running totals
+    format   fill the template cells
+    xlsx     write the payslip spreadsheets         (xlsx renderer)
+    pdf      convert (xlsx) or draw (native) the PDFs
+    load_warm  the months' rows loaded again, from the row cache this time
+
+Usage (from the repo root):
+    python -m benchmarks.bench_payroll --employees 100 1000 10000 --months 2 [--converter stub] [--renderer xlsx] [--render-limit 200]
+
+Every size runs in its own process with a throwaway HOME (config, SQLite database, payslips),
+so your real ~/.zedulopayslips is never touched. Prints one JSON object.
+"""
+
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+SALARY_GRADES = [1800.0, 2450.0, 3200.0, 4750.5, 6800.0, 9900.0, 15000.0, 42000.0]
+
+
+class StubConverter:
+    """Stands in for LibreOffice: writes a placeholder PDF next to the spreadsheet."""
+    persistent = False
+
+    def convert(self, spreadsheet_path):
+        pdf_path = Path(spreadsheet_path).with_suffix(".pdf")
+        pdf_path.write_bytes(b"%PDF-1.4\n%%EOF\n")
+        return str(pdf_path)
+
+    def close(self):
+        pass
+
+
+def month_name(month_no):
+    return datetime(1970, month_no, 1).strftime("%B")
+
+
+def synthetic_employee_workbook(path: Path, employees: int, months: int):
+    from openpyxl import Workbook
+    from src.config import APP_CONFIG
+
+    headers = [
+        APP_CONFIG["EMPLOYEE_NAME_HEADER"],
+        APP_CONFIG["EMPLOYEE_STAFF_NUMBER_HEADER"],
+        APP_CONFIG["EMPLOYEE_POSITION_HEADER"],
+        APP_CONFIG["EMPLOYEE_ACCOUNT_NUMBER_HEADER"],
+        APP_CONFIG["EMPLOYEE_GROSS_INCOME_HEADER"],
+        APP_CONFIG["EMPLOYEE_UNTAXED_BONUS_HEADER"],
+        APP_CONFIG["EMPLOYEE_EXTRA_DEDUCTION_HEADER"],
+        "Email",
+    ]
+
+    # write_only keeps generating 10k x 12 rows quick and light
+    wb = Workbook(write_only=True)
+    for month_no in range(1, months + 1):
+        ws = wb.create_sheet(month_name(month_no))
+        ws.append(headers)
+        for i in range(employees):
+            ws.append([
+                f"Employee {i:05d}",
+                10000 + i,
+                "Engineer" if i % 3 else "Analyst",
+                f"1441000{i:06d}",
+                SALARY_GRADES[i % len(SALARY_GRADES)],
+                500 if month_no == 12 and i % 4 == 0 else 0,
+                0 if i % 5 else 25,
+                f"employee{i}@example.com",
+            ])
+    wb.save(path)
+
+
+def sample_template(path: Path):
+    from io import BytesIO
+    from openpyxl import Workbook
+    from openpyxl.drawing.image import Image
+    from openpyxl.styles import Alignment, Border, Font, Side
+    from PIL import Image as PILImage
+    from src.config import APP_CONFIG
+
+    wb = Workbook()
+    ws = wb.active
+    ws.title = "Payslip"
+
+    logo = BytesIO()
+    PILImage.new("RGB", (160, 60), (20, 90, 160)).save(logo, format="PNG")
+    ws.add_image(Image(logo), "A1")
+
+    ws.merge_cells("A7:E7")
+    ws["A7"] = "PAYSLIP"
+    ws["A7"].font = Font(bold=True, size=16)
+    ws["A7"].alignment = Alignment(horizontal="center")
+
+    thin = Side(style="thin")
+    for key, cell in APP_CONFIG.items():
+        if not (key.startswith("TEMPLATE_") and cell):
+            continue
+        row = ws[cell].row
+        label = ws.cell(row=row, column=1)
+        if label.coordinate != cell and label.value is None:
+            label.value = key[len("TEMPLATE_"):-len("_CELL")].replace("_", " ").title()
+            label.border = Border(top=thin, bottom=thin, left=thin, right=thin)
+
+    for column, width in zip("ABCDE", (22, 14, 16, 18, 18)):
+        ws.column_dimensions[column].width = width
+    wb.save(path)
+
+
+def timed(stages, name, fn, *args):
+    t0 = time.perf_counter()
+    result = fn(*args)
+    stages[name] = stages.get(name, 0) + time.perf_counter() - t0
+    return result
+
+
+def run_size(employees, months, renderer, converter, render_limit, workdir: Path):
+    """Runs inside the per-size process, HOME already points at the throwaway home."""
+    from src.config_manager import ConfigManager
+    from src.services.employee_workbook import EmployeeWorkbook
+    from src.services.payslip_generator import PayslipGenerator
+    from src.services.tax_calc import tax_cache_info
+
+    employee_filepath = workdir / "employees.xlsx"
+    template_filepath = workdir / "template.xlsx"
+
+    t0 = time.perf_counter()
+    synthetic_employee_workbook(employee_filepath, employees, months)
+    sample_template(template_filepath)
+    setup_s = time.perf_counter() - t0
+
+    ConfigManager().save({
+        "EMPLOYEE_SPREADSHEET_FILEPATH": str(employee_filepath),
+        "PAYSLIP_TEMPLATE_FILEPATH"    : str(template_filepath),
+        "EMPLOYEE_PAYSLIPS_FOLDER"     : str(workdir / "payslips"),
+        "EMPLOYEE_EMAIL_HEADER"        : "Email",
+        "PAYSLIP_RENDERER"             : renderer,
+        "PDF_CONVERTER"                : "subprocess" if converter == "stub" else converter,
+        "QUICK_MODE_ENABLED"           : False,
+        "PARALLEL_WORKERS"             : 1,
+    })
+
+    stages = {}
+    rendered = 0
+    year = datetime.now().year
+    started = time.perf_counter()
+
+    employee_workbook = timed(stages, "load", EmployeeWorkbook, str(employee_filepath))
+    try:
+        for month_no in range(1, months + 1):
+            generator = timed(stages, "load", lambda: PayslipGenerator(month_no, year, employee_workbook=employee_workbook))
+            if converter == "stub":
+                generator.renderer.converter = StubConverter()
+
+            rows = timed(stages, "load", lambda: list(generator._employee_rows()))
+            entries = timed(stages, "tax", lambda: [generator.employee_entry(row) for row in rows])
+
+            def ytd():
+                generator.ytd_tracker.set_month_records(month_no, year, entries)
+                return generator.ytd_tracker.get_cumulative_ytd_bulk(month_no, year)
+            ytd_totals = timed(stages, "ytd", ytd)
+
+            def format_details():
+                payslips = []
+                for entry in entries:
+                    entry.update(ytd_totals[entry["staff_number"]])
+                    payslips.append(generator.payslip_details(entry))
+                return payslips
+            payslips = timed(stages, "format", format_details)
+
+            for payslip_details in payslips[:render_limit]:
+                if renderer == "native":
+                    timed(stages, "pdf", generator.write_payslip_pdf, payslip_details)
+                else:
+                    xlsx_filepath = timed(stages, "xlsx", generator.write_payslip_xlsx, payslip_details)
+                    timed(stages, "pdf", generator.spreadsheet_to_pdf, xlsx_filepath, False)
+                rendered += 1
+
+            timed(stages, "pdf", generator.renderer.close)
+    finally:
+        employee_workbook.close()
+
+    # Same workbook again, as when a month is re-run: rows come from the row cache, the workbook stays closed
+    for month_no in range(1, months + 1):
+        def load_warm():
+            generator = PayslipGenerator(month_no, year)
+            try:
+                return list(generator._employee_rows())
+            finally:
+                generator.employee_workbook.close()
+        timed(stages, "load_warm", load_warm)
+
+    total_s = time.perf_counter() - started
+    cache = tax_cache_info()
+
+    return {
+        "employees"  : employees,
+        "months"     : months,
+        "payslips"   : employees * months,
+        "rendered"   : rendered,
+        "setup_s"    : round(setup_s, 3),
+        "total_s"    : round(total_s, 3),
+        "stages_s"   : {name: round(seconds, 3) for name, seconds in stages.items()},
+        "per_render_ms": {
+            name: round(1000 * stages[name] / rendered, 2) for name in ("xlsx", "pdf") if name in stages and rendered
+        },
+        "tax_cache"  : {"hits": cache.hits, "misses": cache.misses},
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--employees", type=int, nargs="+", default=[100], help="workforce sizes to run")
+    parser.add_argument("--months", type=int, default=2, choices=range(1, 13), metavar="1-12", help="month sheets per workbook")
+    parser.add_argument("--renderer", choices=("xlsx", "native"), default="xlsx")
+    parser.add_argument("--converter", choices=("stub", "subprocess", "service"), default="stub",
+                        help="PDF converter for the xlsx renderer; stub writes placeholder PDFs (no LibreOffice)")
+    parser.add_argument("--render-limit", type=int, default=None, help="render at most this many payslips per month")
+    parser.add_argument("--size-worker", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.size_worker:
+        result = run_size(args.employees[0], args.months, args.renderer, args.converter, args.render_limit, Path(os.environ["HOME"]))
+        json.dump(result, sys.stdout)
+        return
+
+    results = {"renderer": args.renderer, "converter": args.converter, "render_limit": args.render_limit, "runs": []}
+
+    for employees in args.employees:
+        home = Path(tempfile.mkdtemp(prefix="zedulo_bench_"))
+        try:
+            command = [
+                sys.executable, "-m", "benchmarks.bench_payroll", "--size-worker",
+                "--employees", str(employees), "--months", str(args.months),
+                "--renderer", args.renderer, "--converter", args.converter,
+            ]
+            if args.render_limit is not None:
+                command += ["--render-limit", str(args.render_limit)]
+
+            # src.config reads HOME at import time: a fresh process per size keeps runs isolated
+            proc = subprocess.run(command, env=dict(os.environ, HOME=str(home)), capture_output=True, text=True)
+            if proc.returncode != 0:
+                results["runs"].append({"employees": employees, "error": proc.stderr.strip().splitlines()[-1:]})
+            else:
+                results["runs"].append(json.loads(proc.stdout))
+        finally:
+            shutil.rmtree(home, ignore_errors=True)
+
+    json.dump(results, sys.stdout, indent=4)
+    print()
+
+
+if __name__ == "__main__":
+    main()
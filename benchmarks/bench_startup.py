@@ -0,0 +1,125 @@
+"""
+Benchmark: how long the app takes to start.
+
+    import       `python -X importtime -c "import src.ui.app"`: total import time of the UI module,
+                 and the heaviest modules it pulls in (cumulative, including their own imports)
+    first_window interpreter start -> main window drawn (App built, first root.update()),
+                 only when a display is available (DISPLAY / WAYLAND_DISPLAY)
+
+Usage (from the repo root):
+    python -m benchmarks.bench_startup [--runs 5] [--top 10]
+
+Every run is a fresh interpreter with a throwaway HOME; the files that importing src.ui.app
+created there are listed under "import_writes" (it should write nothing). Prints one JSON object.
+"""
+
+import argparse
+import json
+import os
+import re
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+IMPORTTIME_LINE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+FIRST_WINDOW_SCRIPT = """
+import time
+from tkinter import Tk
+from src.ui.app import App
+root = Tk()
+App(root)
+root.update()
+print(time.time())
+root.destroy()
+"""
+
+
+def run_python(args, home):
+    return subprocess.run([sys.executable, *args], env=dict(os.environ, HOME=str(home)), capture_output=True, text=True)
+
+
+def parse_importtime(stderr: str, target: str) -> dict:
+    """{module: (self_us, cumulative_us, depth)} of `target` and what it imported, from -X importtime output."""
+    modules = {}
+    # Children are printed before their parent: collect until the next top-level line
+    for line in stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if not match:
+            continue
+        self_us, cumulative_us, indent, module = match.groups()
+        depth = len(indent) // 2
+        modules[module] = (int(self_us), int(cumulative_us), depth)
+        if depth == 0:
+            if module == target:
+                return modules
+            modules = {}
+    raise RuntimeError(f"{target} not found in the -X importtime output")
+
+
+def measure_import(home: Path):
+    proc = run_python(["-X", "importtime", "-c", "import src.ui.app"], home)
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr.strip().splitlines()[-1])
+    return parse_importtime(proc.stderr, "src.ui.app")
+
+
+def measure_first_window(home: Path):
+    started = time.time()
+    proc = run_python(["-c", FIRST_WINDOW_SCRIPT], home)
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr.strip().splitlines()[-1])
+    return float(proc.stdout.strip().splitlines()[-1]) - started
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5, help="fresh interpreters per measurement (median reported)")
+    parser.add_argument("--top", type=int, default=10, help="heaviest imported modules to list")
+    args = parser.parse_args(argv)
+
+    results = {"runs": args.runs}
+    import_totals, first_windows, heaviest, import_writes = [], [], {}, []
+
+    for run in range(args.runs):
+        home = Path(tempfile.mkdtemp(prefix="zedulo_bench_"))
+        try:
+            modules = measure_import(home)
+            import_totals.append(modules["src.ui.app"][1])
+            for module, (_, cumulative_us, depth) in modules.items():
+                # Direct imports of src.ui.app: a package shows up as one entry, with everything it loads
+                if depth == 1:
+                    heaviest.setdefault(module, []).append(cumulative_us)
+            if run == 0:
+                import_writes = sorted(str(path.relative_to(home)) for path in home.rglob("*"))
+        finally:
+            shutil.rmtree(home, ignore_errors=True)
+
+    results["import_ms"] = round(statistics.median(import_totals) / 1000, 1)
+    results["heaviest_imports_ms"] = {
+        module: round(statistics.median(times) / 1000, 1)
+        for module, times in sorted(heaviest.items(), key=lambda item: -statistics.median(item[1]))[:args.top]
+    }
+    results["import_writes"] = import_writes
+
+    if os.environ.get("DISPLAY") or os.environ.get("WAYLAND_DISPLAY"):
+        for _ in range(args.runs):
+            home = Path(tempfile.mkdtemp(prefix="zedulo_bench_"))
+            try:
+                first_windows.append(measure_first_window(home))
+            finally:
+                shutil.rmtree(home, ignore_errors=True)
+        results["first_window_s"] = round(statistics.median(first_windows), 3)
+    else:
+        results["first_window_s"] = {"skipped": "no display (DISPLAY / WAYLAND_DISPLAY not set)"}
+
+    json.dump(results, sys.stdout, indent=4)
+    print()
+
+
+if __name__ == "__main__":
+    main()
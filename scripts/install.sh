@@ -10,6 +10,11 @@ if ! command -v python3-venv &> /dev/null; then
     sudo apt install -y python3-venv
 fi
 
+if ! python3 -c "import uno" &> /dev/null; then
+    echo "⚠️ Python3-uno not found. Installing..."
+    sudo apt install -y libreoffice python3-uno
+fi
+
 pushd scripts &> /dev/null
 
 python3 ../src/setup.py --fresh
@@ -5,7 +5,7 @@ if ! command -v python3 &> /dev/null; then
     sudo apt update && sudo apt install -y python3 python3-venv
 fi
 
-sudo apt update && sudo apt install -y libreoffice
+sudo apt update && sudo apt install -y libreoffice python3-uno
 
 pushd scripts &> /dev/null
 
@@ -0,0 +1,190 @@
+"""
+Command line payslip generation, for cron jobs and headless servers (no tkinter).
+
+Usage (from the app directory):
+    python -m src.cli generate --year 2026 --months 1-12
+    python -m src.cli generate --year 2026 --months 1-3,12 --employees payroll.xlsx --template payslip.xlsx \
+        --output /srv/payslips --workers 8 --progress json
+
+Settings come from ~/.zedulopayslips/config.json; options and --set KEY=VALUE override them for this run only.
+Exit status: 0 on success, 1 when generation fails, 2 on usage errors.
+"""
+
+import argparse
+import json
+import logging
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+from src.config import APP_CONFIG
+from src.config_manager import ConfigManager, validate_config
+
+
+def parse_months(value: str) -> list:
+    """'1-3,12' -> [1, 2, 3, 12]"""
+    months = []
+    for part in value.split(","):
+        part = part.strip()
+        try:
+            if "-" in part:
+                first, last = (int(bound) for bound in part.split("-", 1))
+                months.extend(range(first, last + 1))
+            else:
+                months.append(int(part))
+        except ValueError:
+            raise argparse.ArgumentTypeError(f"invalid month range '{part}', use numbers like 1-12 or 1,3,12")
+
+    if not months or any(month not in range(1, 13) for month in months):
+        raise argparse.ArgumentTypeError(f"months must be between 1 and 12, got '{value}'")
+
+    return sorted(set(months))
+
+
+def parse_setting(value: str):
+    """'KEY=VALUE' -> (KEY, VALUE), VALUE read as JSON when it is (numbers, true/false), else as text."""
+    key, sep, raw = value.partition("=")
+    key = key.strip()
+    if not sep or key not in APP_CONFIG:
+        raise argparse.ArgumentTypeError(f"'{value}' is not KEY=VALUE with a known setting KEY")
+
+    try:
+        return key, json.loads(raw)
+    except ValueError:
+        return key, raw
+
+
+class ProgressPrinter:
+    def __init__(self, year: int, fmt: str, stream=sys.stdout):
+        self.year   = year
+        self.fmt    = fmt
+        self.stream = stream
+        self.count  = 0
+
+    def emit(self, event: dict):
+        if self.fmt == "json":
+            self.stream.write(json.dumps(event, default=str) + "\n")
+        elif self.fmt == "text":
+            self.stream.write(self.text(event) + "\n")
+        self.stream.flush()
+
+    def text(self, event: dict) -> str:
+        if event["event"] == "payslip":
+            return f"[{event['month']} {self.year}] {event['counter']}/{event['total']} {event['name']} -> {event['payslip_filepath']}"
+        if event["event"] == "month":
+            return f"[{event['month']} {self.year}] done in {event['seconds']} s"
+        return f"{event['count']} payslips generated in {event['seconds']} s"
+
+    def progress_callback(self, counter, total, name=None, email=None, month=None, payslip_filepath=None):
+        self.count += 1
+        self.emit({
+            "event"           : "payslip",
+            "year"            : self.year,
+            "month"           : month,
+            "counter"         : counter,
+            "total"           : total,
+            "name"            : name,
+            "email"           : email,
+            "payslip_filepath": payslip_filepath,
+        })
+
+
+def fail(printer: ProgressPrinter, message: str):
+    if printer.fmt == "json":
+        printer.emit({"event": "error", "year": printer.year, "message": message})
+    print(f"error: {message}", file=sys.stderr)
+
+
+def generate(args) -> int:
+    # Imported here so `--help` and usage errors stay instant
+    from src.services.employee_workbook import EmployeeWorkbook
+    from src.services.payslip_generator import PayslipGenerator
+    from src.services.template_cache import payslip_templates
+
+    printer = ProgressPrinter(args.year, args.progress)
+    started = time.perf_counter()
+
+    try:
+        # Raw values: the overrides below may fix what config.json gets wrong, the merged result is validated
+        config = dict(ConfigManager().load(validate=False))
+        config.update(dict(args.settings))
+        if args.employees:
+            config["EMPLOYEE_SPREADSHEET_FILEPATH"] = str(Path(args.employees).expanduser().resolve())
+        if args.template:
+            config["PAYSLIP_TEMPLATE_FILEPATH"] = str(Path(args.template).expanduser().resolve())
+        if args.output:
+            config["EMPLOYEE_PAYSLIPS_FOLDER"] = str(Path(args.output).expanduser().resolve())
+        if args.workers:
+            config["PARALLEL_WORKERS"] = args.workers
+        if args.renderer:
+            config["PAYSLIP_RENDERER"] = args.renderer
+        config = validate_config(config)
+
+        assert config.get("EMPLOYEE_SPREADSHEET_FILEPATH"), "Employee spreadsheet not configured (use --employees)"
+        assert config.get("PAYSLIP_TEMPLATE_FILEPATH"), "Payslip template not configured (use --template)"
+
+        employee_workbook = EmployeeWorkbook(config["EMPLOYEE_SPREADSHEET_FILEPATH"])
+        try:
+            payslip_templates.get(config["PAYSLIP_TEMPLATE_FILEPATH"])
+
+            for month_no in args.months:
+                month_started = time.perf_counter()
+                generator = PayslipGenerator(
+                    month_no=month_no,
+                    year=args.year,
+                    progress_callback=printer.progress_callback,
+                    config=config,
+                    employee_workbook=employee_workbook
+                )
+                generator.generate_payslips()
+                printer.emit({
+                    "event"  : "month",
+                    "year"   : args.year,
+                    "month"  : generator.month,
+                    "count"  : generator.counter,
+                    "seconds": round(time.perf_counter() - month_started, 2),
+                })
+        finally:
+            employee_workbook.close()
+    except KeyboardInterrupt:
+        fail(printer, "interrupted")
+        return 130
+    except Exception as e:
+        logging.debug(e, exc_info=True)
+        fail(printer, str(e) or type(e).__name__)
+        return 1
+
+    printer.emit({"event": "done", "year": args.year, "count": printer.count, "seconds": round(time.perf_counter() - started, 2)})
+    return 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="python -m src.cli", description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("-v", "--verbose", action="store_true", help="log details (stderr)")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    gen = commands.add_parser("generate", help="generate payslips for one year's months")
+    gen.add_argument("--year", type=int, default=datetime.now().year, help="payroll year (default: this year)")
+    gen.add_argument("--months", type=parse_months, default=list(range(1, 13)), help="months, e.g. 1-12, 3 or 1-3,12 (default: 1-12)")
+    gen.add_argument("--employees", help="employee spreadsheet (overrides EMPLOYEE_SPREADSHEET_FILEPATH)")
+    gen.add_argument("--template", help="payslip template (overrides PAYSLIP_TEMPLATE_FILEPATH)")
+    gen.add_argument("--output", help="payslips folder (overrides EMPLOYEE_PAYSLIPS_FOLDER)")
+    gen.add_argument("--workers", type=int, help="worker processes (overrides PARALLEL_WORKERS)")
+    gen.add_argument("--renderer", choices=("xlsx", "native"), help="overrides PAYSLIP_RENDERER")
+    gen.add_argument("--set", dest="settings", type=parse_setting, action="append", default=[], metavar="KEY=VALUE",
+                     help="override any setting for this run, e.g. --set MONEY_PREFIX=GHS (repeatable)")
+    gen.add_argument("--progress", choices=("text", "json", "quiet"), default="text", help="progress output on stdout (json: one object per line)")
+    gen.set_defaults(handler=generate)
+
+    return parser
+
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING, format="%(levelname)s %(message)s", stream=sys.stderr)
+    return args.handler(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
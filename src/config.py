@@ -52,7 +52,33 @@ APP_CONFIG = {
 
     # Misc
     "MONEY_PREFIX"       : "₵",
-    "QUICK_MODE_ENABLED" : False,
+    "QUICK_MODE_ENABLED" : False,          # convert PDFs in the background while the next payslips are written
+    "INCREMENTAL_MODE_ENABLED": True,      # re-render only payslips whose data, template or layout settings changed
+    "ROW_CACHE_ENABLED"  : True,           # keep each month's spreadsheet rows in ~/.zedulopayslips/row_cache until the file changes
+    "PAYSLIP_RENDERER"   : "xlsx",         # "xlsx" (template copy converted by LibreOffice) or "native" (PDF drawn in Python, no LibreOffice)
+    "PDF_CONVERTER"      : "subprocess",   # "subprocess" (one soffice per payslip) or "service" (persistent instances, needs python3-uno)
+    "PDF_CONVERTER_INSTANCES": 2,          # LibreOffice processes converting at once (service, quick mode)
+    "PDF_CONVERSION_TIMEOUT" : 120,        # seconds one payslip conversion may take before soffice is killed
+    "PDF_CONVERSION_RETRIES" : 2,          # extra attempts for a failed conversion (1 s, 2 s, 4 s... apart) before the run fails
+    "PARALLEL_WORKERS"   : 1,              # >1 renders payslips in that many worker processes
+    "TRACING_ENABLED"    : False,          # per-stage timing events, summarised in the log after every month
+    "TRACE_LOG_PATH"     : f"{APP_HOME_DIR}/trace.jsonl",   # JSONL event log while tracing ("" for the summary only)
+    "BUNDLE_PDF_ENABLED" : False,          # after each month, all its payslips in <year>/<Month>_<year>_Payslips.pdf (needs pypdf)
+    "BUNDLE_ZIP_ENABLED" : False,          # ... and/or in <year>/<Month>_<year>_Payslips.zip
+
+    # Mailing
+    "MAIL_BACKEND"       : "thunderbird",  # "thunderbird" (compose window per payslip), "smtp" (sent directly) or "export" (message files)
+    "MAIL_FROM"          : "",             # sender address for SMTP (default: SMTP_USERNAME)
+    "SMTP_HOST"          : "",
+    "SMTP_PORT"          : 587,
+    "SMTP_SECURITY"      : "starttls",     # "starttls", "ssl" (usually port 465) or "none" (local test servers)
+    "SMTP_USERNAME"      : "",
+    "SMTP_PASSWORD"      : "",
+    "SMTP_CONNECTIONS"   : 2,              # emails sent concurrently over that many reused connections
+    "SMTP_RATE_LIMIT"    : 0,              # max emails per minute, 0 for no limit
+    "MAIL_EXPORT_FOLDER" : f"{HOME_DIR}/{APP_NAME.lower()}/outbox",
+    "MAIL_EXPORT_FORMAT" : "eml",          # "eml" (one RFC 5322 file per payslip) or "mbox" (one file per batch)
+
     "USERNAME"           : "Administrator",
     "PAYSLIP_DATE"       : "",
 }
@@ -1,27 +1,160 @@
 import json
 import os
+import re
+import tempfile
 from pathlib import Path
+from threading import Lock
+from types import MappingProxyType
 from .config import APP_CONFIG_FILEPATH, APP_CONFIG
 
 
+class ConfigError(ValueError):
+    """A setting that would make payslip generation fail, reported before any work starts."""
+
+
+CELL_REFERENCE = re.compile(r"^[A-Z]{1,3}[1-9][0-9]{0,6}$")
+
+# Headers without which no payslip can be made (the others may be left empty: "not in the spreadsheet")
+REQUIRED_HEADERS = [
+    "EMPLOYEE_NAME_HEADER",
+    "EMPLOYEE_STAFF_NUMBER_HEADER",
+    "EMPLOYEE_GROSS_INCOME_HEADER",
+    "EMPLOYEE_UNTAXED_BONUS_HEADER",
+    "EMPLOYEE_EXTRA_DEDUCTION_HEADER",
+]
+
+CHOICES = {
+    "PAYSLIP_RENDERER"  : ("xlsx", "native"),
+    "PDF_CONVERTER"     : ("subprocess", "service"),
+    "MAIL_BACKEND"      : ("thunderbird", "smtp", "export"),
+    "MAIL_EXPORT_FORMAT": ("eml", "mbox"),
+    "SMTP_SECURITY"     : ("starttls", "ssl", "none"),
+}
+
+# Whole-number settings (the Settings window saves every Entry as text)
+NUMBERS = {
+    "PDF_CONVERTER_INSTANCES": 1,  # smallest allowed value
+    "PDF_CONVERSION_TIMEOUT" : 1,
+    "PDF_CONVERSION_RETRIES" : 0,
+    "PARALLEL_WORKERS"       : 1,
+    "SMTP_PORT"              : 0,
+    "SMTP_CONNECTIONS"       : 1,
+    "SMTP_RATE_LIMIT"        : 0,
+}
+
+
+def validate_config(config: dict) -> dict:
+    """
+    Returns a normalised copy of `config` (numbers as int, *_ENABLED as bool, cells upper-case)
+    or raises ConfigError listing every bad setting.
+    """
+    config = dict(config)
+    errors = []
+
+    for key, value in config.items():
+        if key.endswith("CELL"):
+            value = str(value or "").strip().upper()
+            if value and not CELL_REFERENCE.match(value):
+                errors.append(f"{key}: '{value}' is not a cell reference like B12")
+            config[key] = value
+
+        elif key.endswith("HEADER"):
+            config[key] = str(value or "").strip()
+            if key in REQUIRED_HEADERS and not config[key]:
+                errors.append(f"{key} must not be empty")
+
+        elif key.endswith("ENABLED"):
+            config[key] = value.strip().lower() == "true" if isinstance(value, str) else bool(value)
+
+        elif key in NUMBERS:
+            try:
+                config[key] = int(value)
+            except (TypeError, ValueError):
+                errors.append(f"{key}: '{value}' is not a whole number")
+                continue
+            if config[key] < NUMBERS[key]:
+                errors.append(f"{key} must be at least {NUMBERS[key]}")
+
+        elif key in CHOICES and value not in CHOICES[key]:
+            errors.append(f"{key}: '{value}' must be one of {', '.join(CHOICES[key])}")
+
+    if errors:
+        raise ConfigError("Invalid settings:\n" + "\n".join(errors))
+
+    return config
+
+
 class ConfigManager:
+    """
+    config.json, parsed and validated once per change of the file: every caller shares the same
+    read-only snapshot until save() (or an edit on disk) replaces it.
+    """
+    _lock     = Lock()
+    _snapshot = None   # (file stat key, raw merged config, validated snapshot or the ConfigError message)
+
     def __init__(self):
         self.path = Path(APP_CONFIG_FILEPATH)
-        self._ensure_exists()
 
     def _ensure_exists(self):
         if not self.path.exists():
             self.path.parent.mkdir(parents=True, exist_ok=True)
-            with open(self.path, "w") as f:
-                json.dump(APP_CONFIG, f, indent=4)
+            self._write(APP_CONFIG)
+
+    def _read(self):
+        with ConfigManager._lock:
+            try:
+                stat = self.path.stat()
+            except FileNotFoundError:
+                self._ensure_exists()
+                stat = self.path.stat()
+            key = (str(self.path), stat.st_mtime_ns, stat.st_size)
 
-    def load(self) -> dict:
-        with open(self.path, "r") as f:
-            return json.load(f)
+            cached = ConfigManager._snapshot
+            if cached is not None and cached[0] == key:
+                return cached
+
+            # Defaults first so settings added after install still have a value
+            config = APP_CONFIG.copy()
+            with open(self.path, "r") as f:
+                config.update(json.load(f))
+
+            try:
+                snapshot = MappingProxyType(validate_config(config))
+            except ConfigError as e:
+                snapshot = str(e)   # not the exception: re-raising it would pile up tracebacks in the cache
+
+            ConfigManager._snapshot = (key, MappingProxyType(config), snapshot)
+            return ConfigManager._snapshot
+
+    def load(self, validate=True):
+        """
+        The current settings as a read-only mapping (copy it with dict() to change values for one run).
+        Raises ConfigError when a setting is invalid, unless validate=False (the raw values, e.g. to edit them).
+        """
+        _, config, snapshot = self._read()
+        if not validate:
+            return config
+        if isinstance(snapshot, str):
+            raise ConfigError(snapshot)
+        return snapshot
 
     def save(self, updates: dict):
-        config = self.load()
+        """Validates and writes the merged settings atomically; raises ConfigError without writing when invalid."""
+        config = dict(self.load(validate=False))
         config.update(updates)
+        config = validate_config(config)
+
+        with ConfigManager._lock:
+            self._write(config)
+            ConfigManager._snapshot = None
 
-        with open(self.path, "w") as f:
-            json.dump(config, f, indent=4)
+    def _write(self, config):
+        # Temp file in the same folder + rename: readers never see a half-written config.json
+        fd, tmp_path = tempfile.mkstemp(dir=self.path.parent, prefix=".config.", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump(dict(config), f, indent=4)
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
@@ -1,29 +1,40 @@
+import os
 import sqlite3
+import sys
+import threading
 from pathlib import Path
 from src.config import APP_SQLITE_DB_FILEPATH
+from src.services.tracing import NULL_TRACER
 
-TABLES = {"payslip_records": "payslip_records"}
+TABLES = {
+    "payslip_records": "payslip_records",
+    "ytd_totals"     : "ytd_totals",   # running (cumulative) totals per staff/year/month, kept in step with payslip_records
+    "payslip_manifest": "payslip_manifest",  # fingerprint of what every rendered payslip was made from
+}
 
-def _migrate_schema(conn):
-    cur = conn.cursor()
-    cur.execute(f"PRAGMA table_info({TABLES['payslip_records']})")
-    cols = [row[1] for row in cur.fetchall()]
-
-    if "year" not in cols:
-        cur.execute(f"ALTER TABLE {TABLES['payslip_records']} ADD COLUMN year INTEGER NOT NULL DEFAULT 0")
-        conn.commit()
+def _rebuild_ytd_totals(conn):
+    """Recomputes every running total from the raw payslip_records."""
+    conn.execute(f"DELETE FROM {TABLES['ytd_totals']}")
+    conn.execute(f"""
+        INSERT INTO {TABLES['ytd_totals']} (staff_number, year, month_no, tier_1, tier_2, gross_pay)
+        SELECT
+            staff_number, year, month_no,
+            SUM(COALESCE(tier_1, 0)) OVER w,
+            SUM(COALESCE(tier_2, 0)) OVER w,
+            SUM(COALESCE(gross_pay, 0)) OVER w
+        FROM {TABLES['payslip_records']}
+        WINDOW w AS (PARTITION BY staff_number, year ORDER BY month_no)
+    """)
 
-def open_db():
-    db_path = Path(APP_SQLITE_DB_FILEPATH)
-    db_path.parent.mkdir(parents=True, exist_ok=True)
-    conn = sqlite3.connect(db_path)
-    conn.row_factory = sqlite3.Row
+def rebuild_ytd_totals():
+    with open_db() as db_conn:
+        _rebuild_ytd_totals(db_conn)
 
-    return conn
+def _schema_v1(conn):
+    """The tables as of the first versioned schema, also patching databases from before versioning."""
+    tables = {row["name"] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
 
-with open_db() as db_conn:
-    db = db_conn.cursor()
-    db.execute(f"""
+    conn.execute(f"""
         CREATE TABLE IF NOT EXISTS {TABLES['payslip_records']} (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
             staff_number INTEGER NOT NULL,
@@ -36,13 +47,118 @@ with open_db() as db_conn:
             UNIQUE(staff_number, month_no, year)
         )
     """)
-    _migrate_schema(db_conn)  # Patch old databases
-    db_conn.commit()
+    if TABLES['payslip_records'] in tables:
+        # Unversioned database: the year column came late, probed this one time only
+        cols = [row[1] for row in conn.execute(f"PRAGMA table_info({TABLES['payslip_records']})")]
+        if "year" not in cols:
+            conn.execute(f"ALTER TABLE {TABLES['payslip_records']} ADD COLUMN year INTEGER NOT NULL DEFAULT 0")
+
+    conn.execute(f"""
+        CREATE TABLE IF NOT EXISTS {TABLES['ytd_totals']} (
+            staff_number INTEGER NOT NULL,
+            year INTEGER NOT NULL,
+            month_no INTEGER NOT NULL,
+            tier_1 INTEGER DEFAULT 0,
+            tier_2 INTEGER DEFAULT 0,
+            gross_pay INTEGER DEFAULT 0,
+            PRIMARY KEY(staff_number, year, month_no)
+        ) WITHOUT ROWID
+    """)
+    if TABLES['ytd_totals'] not in tables:
+        _rebuild_ytd_totals(conn)  # Databases from before the running totals existed
+
+    conn.execute(f"""
+        CREATE TABLE IF NOT EXISTS {TABLES['payslip_manifest']} (
+            staff_number INTEGER NOT NULL,
+            year INTEGER NOT NULL,
+            month_no INTEGER NOT NULL,
+            fingerprint TEXT NOT NULL,
+            xlsx_filepath TEXT,
+            pdf_filepath TEXT NOT NULL,
+            PRIMARY KEY(staff_number, year, month_no)
+        ) WITHOUT ROWID
+    """)
+
+# MIGRATIONS[n] takes a database from schema version n to n + 1. Append, never edit a released one.
+MIGRATIONS = [
+    _schema_v1,
+]
+
+
+class ConnectionManager:
+    """
+    One SQLite connection per thread (and per process), opened on first use and kept open:
+    WAL journal (readers never wait for the writer), synchronous=NORMAL (no fsync per commit in WAL),
+    and every statement of the connection compiled once and reused from its statement cache.
+    The schema is brought up to date by the first connection of the process.
+
+    `with open_db() as conn:` commits (or rolls back) a transaction, it does not close the connection.
+    """
+    def __init__(self, db_filepath):
+        self.db_filepath  = Path(db_filepath)
+        self.local        = threading.local()
+        self.lock         = threading.Lock()
+        self.schema_ready = False
+
+    def connection(self) -> sqlite3.Connection:
+        conn = getattr(self.local, "conn", None)
+        if conn is None or self.local.pid != os.getpid():
+            conn = self._connect()
+            self.local.conn = conn
+            self.local.pid  = os.getpid()
+        return conn
+
+    def _connect(self):
+        self.db_filepath.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(self.db_filepath, timeout=30, cached_statements=256)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode = WAL")
+        conn.execute("PRAGMA synchronous = NORMAL")
+
+        with self.lock:
+            if not self.schema_ready:
+                self._upgrade_schema(conn)
+                self.schema_ready = True
+        return conn
+
+    def _upgrade_schema(self, conn):
+        conn.execute("CREATE TABLE IF NOT EXISTS schema_version (version INTEGER NOT NULL)")
+        conn.commit()
+
+        # IMMEDIATE: another process upgrading at the same time waits here, then finds it done
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT version FROM schema_version").fetchone()
+            version = row["version"] if row else 0
+            for migration in MIGRATIONS[version:]:
+                migration(conn)
+
+            conn.execute("DELETE FROM schema_version")
+            conn.execute("INSERT INTO schema_version (version) VALUES (?)", (max(version, len(MIGRATIONS)),))
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+
+    def close(self):
+        """Closes this thread's connection (the others close when their thread ends)."""
+        conn = getattr(self.local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self.local.conn = None
+
+
+connections = ConnectionManager(APP_SQLITE_DB_FILEPATH)
+
+def open_db() -> sqlite3.Connection:
+    return connections.connection()
 
 
 class YTD_Tracker:
-    def __init__(self):
-        self.table = TABLES["payslip_records"]
+    def __init__(self, tracer=NULL_TRACER):
+        self.table        = TABLES["payslip_records"]
+        self.totals_table = TABLES["ytd_totals"]
+        self.tracer       = tracer
 
     def get_ytd(self, month_no: int, year: int, employee: dict) -> dict:
         with open_db() as db_conn:
@@ -70,7 +186,15 @@ class YTD_Tracker:
             }
 
     def set_month_record(self, month_no: int, year: int, employee: dict) -> None:
+        with self.tracer.span("ytd.set_month_record", staff_number=int(employee["staff_number"])):
+            self.set_month_records(month_no, year, [employee])
+
+    def set_month_records(self, month_no: int, year: int, employees: list) -> None:
         """
+        Inserts/replaces the month's records of every employee in one transaction (one commit/fsync)
+        and moves the running totals along:
+            - this month's total  = latest earlier total + this month's values
+            - later months' totals += (new - previous) values of this month, for back-dated corrections
         """
         necessary_keys = [
             'staff_number',
@@ -79,40 +203,145 @@ class YTD_Tracker:
             'tier_2',
             'gross_income'
         ]
-        assert all([key in employee.keys() for key in necessary_keys]), f"employee dict must contain these keys: {necessary_keys}"
+        for employee in employees:
+            assert all([key in employee.keys() for key in necessary_keys]), f"employee dict must contain these keys: {necessary_keys}"
+
+        with self.tracer.span("ytd.set_month_records", month_no=month_no, year=year, employees=len(employees)):
+            self._set_month_records(month_no, year, employees)
+
+    def _set_month_records(self, month_no: int, year: int, employees: list) -> None:
+        records = {
+            int(employee['staff_number']): (employee['name'], employee['employee_ssf'] or 0, employee['tier_2'] or 0, employee['gross_income'] or 0)
+            for employee in employees
+        }
 
         with open_db() as db_conn:
             db = db_conn.cursor()
+
             db.execute(f"""
+                SELECT staff_number, tier_1, tier_2, gross_pay
+                FROM {self.table}
+                WHERE month_no = ? AND year = ?
+            """, (month_no, year))
+            previous = {row["staff_number"]: (row["tier_1"] or 0, row["tier_2"] or 0, row["gross_pay"] or 0) for row in db.fetchall()}
+
+            # Bare columns with MAX() come from the max row in SQLite: latest total before this month
+            db.execute(f"""
+                SELECT staff_number, MAX(month_no), tier_1, tier_2, gross_pay
+                FROM {self.totals_table}
+                WHERE month_no < ? AND year = ?
+                GROUP BY staff_number
+            """, (month_no, year))
+            earlier = {row["staff_number"]: (row["tier_1"], row["tier_2"], row["gross_pay"]) for row in db.fetchall()}
+
+            db.executemany(f"""
                 INSERT OR REPLACE INTO {self.table}
                 (staff_number, name, month_no, year, tier_1, tier_2, gross_pay)
                 VALUES (?, ?, ?, ?, ?, ?, ?)
-            """, (
-                int(employee['staff_number']),
-                employee['name'],
-                month_no,
-                year,
-                employee['employee_ssf'],
-                employee['tier_2'],
-                employee['gross_income']
-            ))
+            """, [
+                (staff_number, name, month_no, year, tier_1, tier_2, gross_pay)
+                for staff_number, (name, tier_1, tier_2, gross_pay) in records.items()
+            ])
+
+            totals, deltas = [], []
+            for staff_number, (_, tier_1, tier_2, gross_pay) in records.items():
+                base_1, base_2, base_gross = earlier.get(staff_number, (0, 0, 0))
+                totals.append((staff_number, year, month_no, base_1 + tier_1, base_2 + tier_2, base_gross + gross_pay))
+
+                old_1, old_2, old_gross = previous.get(staff_number, (0, 0, 0))
+                if (tier_1, tier_2, gross_pay) != (old_1, old_2, old_gross):
+                    deltas.append((tier_1 - old_1, tier_2 - old_2, gross_pay - old_gross, staff_number, year, month_no))
+
+            db.executemany(f"""
+                INSERT OR REPLACE INTO {self.totals_table}
+                (staff_number, year, month_no, tier_1, tier_2, gross_pay)
+                VALUES (?, ?, ?, ?, ?, ?)
+            """, totals)
+            db.executemany(f"""
+                UPDATE {self.totals_table}
+                SET tier_1 = tier_1 + ?, tier_2 = tier_2 + ?, gross_pay = gross_pay + ?
+                WHERE staff_number = ? AND year = ? AND month_no > ?
+            """, deltas)
             db_conn.commit()
 
     def get_cumulative_ytd(self, up_to_month: int, year: int, employee: dict) -> dict:
-        with open_db() as db_conn:
+        with self.tracer.span("ytd.get_cumulative_ytd", staff_number=int(employee["staff_number"])), open_db() as db_conn:
             db = db_conn.cursor()
             db.execute(f"""
-                SELECT
-                    SUM(tier_1) as tier_1,
-                    SUM(tier_2) as tier_2,
-                    SUM(gross_pay) as gross_pay
-                FROM {self.table}
-                WHERE staff_number = ? AND month_no <= ? AND year = ?
-            """, (int(employee["staff_number"]), up_to_month, year))
+                SELECT tier_1, tier_2, gross_pay
+                FROM {self.totals_table}
+                WHERE staff_number = ? AND year = ? AND month_no <= ?
+                ORDER BY month_no DESC
+                LIMIT 1
+            """, (int(employee["staff_number"]), year, up_to_month))
             row = db.fetchone()
             return {
                 "staff_number": int(employee["staff_number"]),
-                "ytd_tier_1": row["tier_1"] or 0,
-                "ytd_tier_2": row["tier_2"] or 0,
-                "ytd_gross_pay": row["gross_pay"] or 0,
+                "ytd_tier_1": row["tier_1"] if row else 0,
+                "ytd_tier_2": row["tier_2"] if row else 0,
+                "ytd_gross_pay": row["gross_pay"] if row else 0,
             }
+
+    def get_cumulative_ytd_bulk(self, up_to_month: int, year: int) -> dict:
+        """
+        get_cumulative_ytd for every staff member of the year in one query.
+        Returns {staff_number: {"staff_number", "ytd_tier_1", "ytd_tier_2", "ytd_gross_pay"}}.
+        """
+        with self.tracer.span("ytd.get_cumulative_ytd_bulk", month_no=up_to_month, year=year), open_db() as db_conn:
+            db = db_conn.cursor()
+            db.execute(f"""
+                SELECT staff_number, MAX(month_no), tier_1, tier_2, gross_pay
+                FROM {self.totals_table}
+                WHERE month_no <= ? AND year = ?
+                GROUP BY staff_number
+            """, (up_to_month, year))
+            return {
+                row["staff_number"]: {
+                    "staff_number": row["staff_number"],
+                    "ytd_tier_1": row["tier_1"],
+                    "ytd_tier_2": row["tier_2"],
+                    "ytd_gross_pay": row["gross_pay"],
+                }
+                for row in db.fetchall()
+            }
+
+
+class PayslipManifest:
+    """What every payslip file was rendered from, so unchanged payslips are not rendered again."""
+    def __init__(self):
+        self.table = TABLES["payslip_manifest"]
+
+    def get_month(self, month_no: int, year: int) -> dict:
+        """Returns {staff_number: (fingerprint, xlsx_filepath, pdf_filepath)}."""
+        with open_db() as db_conn:
+            db = db_conn.cursor()
+            db.execute(f"""
+                SELECT staff_number, fingerprint, xlsx_filepath, pdf_filepath
+                FROM {self.table}
+                WHERE month_no = ? AND year = ?
+            """, (month_no, year))
+            return {row["staff_number"]: (row["fingerprint"], row["xlsx_filepath"], row["pdf_filepath"]) for row in db.fetchall()}
+
+    def set_entries(self, month_no: int, year: int, entries: list) -> None:
+        """entries: (staff_number, fingerprint, xlsx_filepath, pdf_filepath) tuples, written in one transaction."""
+        if not entries:
+            return
+
+        with open_db() as db_conn:
+            db_conn.executemany(f"""
+                INSERT OR REPLACE INTO {self.table}
+                (staff_number, year, month_no, fingerprint, xlsx_filepath, pdf_filepath)
+                VALUES (?, ?, ?, ?, ?, ?)
+            """, [
+                (int(staff_number), year, month_no, fingerprint, xlsx_filepath, pdf_filepath)
+                for staff_number, fingerprint, xlsx_filepath, pdf_filepath in entries
+            ])
+            db_conn.commit()
+
+
+if __name__ == "__main__":
+    if "--rebuild-ytd" in sys.argv:
+        rebuild_ytd_totals()
+        print(f"YTD running totals rebuilt in {APP_SQLITE_DB_FILEPATH}")
+    else:
+        print("Usage: python -m src.services.db --rebuild-ytd")
@@ -0,0 +1,54 @@
+"""
+Employee spreadsheet reader: the workbook is opened once in read-only/values-only mode and shared by
+every month's PayslipGenerator. Only the sheet that is asked for gets parsed, and rows come out
+as plain value tuples instead of Cell objects. The file is only opened when first read, so months
+served from the row cache (src.services.row_cache) never parse it; a missing or non-xlsx file is
+still rejected when the EmployeeWorkbook is created.
+"""
+
+import os
+import zipfile
+
+from openpyxl import load_workbook
+from openpyxl.utils.exceptions import InvalidFileException
+
+
+class EmployeeWorkbook:
+    def __init__(self, filepath):
+        os.stat(filepath)   # FileNotFoundError / PermissionError now, not halfway through a run
+        # Cheap: reads the zip directory at the end of the file, nothing is parsed
+        if not zipfile.is_zipfile(filepath):
+            raise InvalidFileException(f"{filepath} is not an Excel workbook (.xlsx)")
+        self.filepath = filepath
+        self._wb = None
+
+    @property
+    def wb(self):
+        if self._wb is None:
+            self._wb = load_workbook(self.filepath, read_only=True, data_only=True)
+        return self._wb
+
+    @property
+    def sheetnames(self):
+        return self.wb.sheetnames
+
+    def header(self, sheet_name) -> list:
+        """Row 1 of the sheet, stripped strings ("" for empty cells)."""
+        for row in self.wb[sheet_name].iter_rows(min_row=1, max_row=1, values_only=True):
+            return [str(value).strip() if value is not None else "" for value in row]
+        return []
+
+    def rows(self, sheet_name):
+        """Value tuples of every row below the header."""
+        return self.wb[sheet_name].iter_rows(min_row=2, values_only=True)
+
+    def close(self):
+        if self._wb is not None:
+            self._wb.close()
+            self._wb = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
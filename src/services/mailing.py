@@ -1,9 +1,53 @@
-"""Email service for payslips via Thunderbird CLI only. No SMTP, no credentials."""
+"""
+Email service for payslips, backend picked by MAIL_BACKEND:
+    - "thunderbird" (default): opens a Thunderbird compose window per payslip, no credentials needed.
+    - "smtp": sends MIME messages with the PDF attached over a small pool of reused SMTP connections.
+    - "export": writes the same messages to MAIL_EXPORT_FOLDER (.eml files or one mbox) for an MTA to pick up.
+"""
 
+import os
+import queue
+import smtplib
+import ssl
 import subprocess
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from email import policy
+from email.generator import BytesGenerator
+from email.message import EmailMessage
+from email.utils import formatdate, make_msgid, parseaddr
 from pathlib import Path
+from threading import Lock
 from urllib.parse import quote
 
+from src.config_manager import ConfigManager
+
+
+def payslip_subject(month):
+    return f"Zedulo payslip for {month}"
+
+def payslip_body(employee_name, month):
+    return f"""Dear {employee_name.title()},
+
+Please find attached your payslip for {month}.
+
+Best regards,
+HR"""
+
+def build_payslip_message(sender, recipient_email, employee_name, month, pdf_path) -> EmailMessage:
+    message = EmailMessage()
+    message["From"]    = sender
+    message["To"]      = recipient_email
+    message["Subject"] = payslip_subject(month)
+    message["Date"]    = formatdate(localtime=True)
+    message["Message-ID"] = make_msgid(domain=parseaddr(sender)[1].rpartition("@")[2] or None)
+    message.set_content(payslip_body(employee_name, month))
+
+    pdf_path = Path(pdf_path)
+    message.add_attachment(pdf_path.read_bytes(), maintype="application", subtype="pdf", filename=pdf_path.name)
+    return message
+
 
 class EmailSender:
     def __init__(self):
@@ -24,13 +68,8 @@ class EmailSender:
         if not self.thunderbird_cmd:
             return False, "Thunderbird not found"
 
-        subject = f"Zedulo payslip for {month}"
-        body = f"""Dear {employee_name.title()},
-
-Please find attached your payslip for {month}.
-
-Best regards,
-HR"""
+        subject = payslip_subject(month)
+        body = payslip_body(employee_name, month)
 
         try:
             args = f'to={recipient_email},subject={quote(subject)},body={quote(body)},attachment={pdf_path}'
@@ -39,9 +78,12 @@ HR"""
         except Exception as e:
             return False, str(e)
 
-    def send_bulk(self, payslip_list):
+    def send_bulk(self, payslip_list, stop_event=None, progress_callback=None):
         results = {"success": 0, "failed": 0, "errors": []}
-        for p in payslip_list:
+        for i, p in enumerate(payslip_list):
+            if stop_event is not None and stop_event.is_set():
+                break
+
             ok, msg = self.send_payslip(p["email"], p["name"], p["month"], p["pdf"])
             if ok:
                 results["success"] += 1
@@ -49,11 +91,273 @@ HR"""
                 results["failed"] += 1
                 results["errors"].append({"email": p["email"], "error": msg})
 
+            if progress_callback:
+                progress_callback(i + 1, len(payslip_list))
+
+        return results
+
+    def close(self):
+        pass
+
+
+class RateLimiter:
+    """At most `per_minute` calls per minute across all threads, evenly spaced. 0 means unlimited."""
+    def __init__(self, per_minute: float):
+        self.interval  = 60.0 / per_minute if per_minute > 0 else 0
+        self.next_slot = 0.0
+        self.lock      = Lock()
+
+    def wait(self):
+        if not self.interval:
+            return
+
+        with self.lock:
+            now = time.monotonic()
+            slot = max(now, self.next_slot)
+            self.next_slot = slot + self.interval
+        time.sleep(slot - now)
+
+
+class SmtpSender:
+    """
+    Sends payslips through SMTP_HOST. Connections are opened on demand, kept open between messages
+    and shared by up to SMTP_CONNECTIONS sending threads; SMTP_RATE_LIMIT caps messages per minute.
+    """
+    def __init__(self, settings: dict = None):
+        settings = settings or ConfigManager().load()
+
+        self.host        = settings["SMTP_HOST"]
+        self.port        = int(settings["SMTP_PORT"] or 0)
+        self.security    = settings["SMTP_SECURITY"]
+        self.username    = settings["SMTP_USERNAME"]
+        self.password    = settings["SMTP_PASSWORD"]
+        self.sender      = settings["MAIL_FROM"] or settings["SMTP_USERNAME"]
+        self.connections = max(1, int(settings["SMTP_CONNECTIONS"] or 1))
+        self.rate_limiter = RateLimiter(float(settings["SMTP_RATE_LIMIT"] or 0))
+        self.timeout     = 30
+        self.idle        = queue.LifoQueue()  # open connections not in use, most recently used first
+
+        assert self.security in ("starttls", "ssl", "none"), f"SMTP_SECURITY must be 'starttls', 'ssl' or 'none', got '{self.security}'"
+
+    def _connect(self):
+        if self.security == "ssl":
+            smtp = smtplib.SMTP_SSL(self.host, self.port, timeout=self.timeout, context=ssl.create_default_context())
+        else:
+            smtp = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+
+        try:
+            if self.security == "starttls":
+                smtp.starttls(context=ssl.create_default_context())
+            if self.username:
+                smtp.login(self.username, self.password)
+        except BaseException:
+            smtp.close()   # a failed handshake or login would otherwise leak the socket on every retry
+            raise
+        return smtp
+
+    def _acquire(self):
+        try:
+            return self.idle.get_nowait()
+        except queue.Empty:
+            return self._connect()
+
+    def _release(self, smtp):
+        if self.idle.qsize() < self.connections:
+            self.idle.put(smtp)
+        else:
+            self._discard(smtp)
+
+    def _discard(self, smtp):
+        try:
+            smtp.quit()
+        except Exception:
+            smtp.close()
+
+    def send_payslip(self, recipient_email, employee_name, month, pdf_path):
+        if not recipient_email or not Path(pdf_path).exists():
+            return False, "Invalid email or PDF not found"
+        if not self.host:
+            return False, "SMTP host not configured"
+        if not self.sender:
+            return False, "Sender address not configured (MAIL_FROM)"
+
+        try:
+            message = build_payslip_message(self.sender, recipient_email, employee_name, month, pdf_path)
+        except Exception as e:
+            return False, str(e)
+
+        self.rate_limiter.wait()
+
+        # A pooled connection may have been dropped by the server while idle: retry once on a fresh one
+        for attempt in (1, 2):
+            smtp = None
+            try:
+                smtp = self._acquire()
+                smtp.send_message(message)
+            except smtplib.SMTPServerDisconnected as e:
+                if smtp is not None:
+                    smtp.close()
+                if attempt == 2:
+                    return False, str(e) or "SMTP server disconnected"
+                continue
+            except smtplib.SMTPException as e:
+                # Refused recipient/sender, failed login: the message fails, a working connection is kept
+                if smtp is not None:
+                    self._release(smtp)
+                return False, str(e)
+            except Exception as e:
+                # Network errors (refused, reset, timeout) and anything unexpected: drop the connection
+                if smtp is not None:
+                    smtp.close()
+                return False, str(e) or type(e).__name__
+
+            self._release(smtp)
+            return True, f"Sent to {recipient_email}"
+
+    def send_bulk(self, payslip_list, stop_event=None, progress_callback=None):
+        results = {"success": 0, "failed": 0, "errors": []}
+        lock = Lock()
+        done = 0
+
+        def send(p):
+            nonlocal done
+            if stop_event is not None and stop_event.is_set():
+                return
+
+            ok, msg = self.send_payslip(p["email"], p["name"], p["month"], p["pdf"])
+            with lock:
+                if ok:
+                    results["success"] += 1
+                else:
+                    results["failed"] += 1
+                    results["errors"].append({"email": p["email"], "error": msg})
+                done += 1
+                if progress_callback:
+                    progress_callback(done, len(payslip_list))
+
+        try:
+            with ThreadPoolExecutor(max_workers=self.connections) as pool:
+                list(pool.map(send, payslip_list))
+        finally:
+            self.close()
+
+        return results
+
+    def close(self):
+        while True:
+            try:
+                self._discard(self.idle.get_nowait())
+            except queue.Empty:
+                return
+
+
+class MailExporter:
+    """
+    Writes ready-to-send messages instead of sending them, one at a time (only the current
+    payslip's PDF is ever in memory): an RFC 5322 .eml file per payslip, or all of them appended
+    to one mbox file per exporter (MAIL_EXPORT_FORMAT).
+    """
+    def __init__(self, settings: dict = None):
+        settings = settings or ConfigManager().load()
+
+        self.folder = Path(settings["MAIL_EXPORT_FOLDER"]).expanduser()
+        self.format = settings["MAIL_EXPORT_FORMAT"]
+        self.sender = settings["MAIL_FROM"] or settings["SMTP_USERNAME"]
+        self.mbox_filepath = None
+        self.mbox = None
+        self.lock = Lock()
+
+        assert self.format in ("eml", "mbox"), f"MAIL_EXPORT_FORMAT must be 'eml' or 'mbox', got '{self.format}'"
+
+    def eml_filepath(self, pdf_path):
+        # Payslips live in <folder>/<year>/<Month>/, mirror that so years never overwrite each other
+        pdf_path = Path(pdf_path)
+        return self.folder / pdf_path.parent.parent.name / pdf_path.parent.name / f"{pdf_path.stem}.eml"
+
+    def write_eml(self, message, pdf_path):
+        eml_path = self.eml_filepath(pdf_path)
+        eml_path.parent.mkdir(parents=True, exist_ok=True)
+
+        # Written aside then renamed: a spool watcher never picks up half a message
+        tmp_path = eml_path.with_name(eml_path.name + ".tmp")
+        with open(tmp_path, "wb") as f:
+            BytesGenerator(f, policy=policy.SMTP).flatten(message)
+        os.replace(tmp_path, eml_path)
+        return eml_path
+
+    def write_mbox(self, message):
+        with self.lock:
+            if self.mbox is None:
+                self.folder.mkdir(parents=True, exist_ok=True)
+                self.mbox_filepath = self.folder / f"payslips_{datetime.now().strftime('%Y%m%d-%H%M%S')}.mbox"
+                self.mbox = open(self.mbox_filepath, "ab")
+
+            self.mbox.write(f"From MAILER-DAEMON {time.asctime()}\n".encode())
+            # mangle_from_ escapes body lines starting with "From " so they don't split the message
+            BytesGenerator(self.mbox, mangle_from_=True, policy=policy.default).flatten(message)
+            self.mbox.write(b"\n")
+            return self.mbox_filepath
+
+    def send_payslip(self, recipient_email, employee_name, month, pdf_path):
+        if not recipient_email or not Path(pdf_path).exists():
+            return False, "Invalid email or PDF not found"
+        if not self.sender:
+            return False, "Sender address not configured (MAIL_FROM)"
+
+        try:
+            message = build_payslip_message(self.sender, recipient_email, employee_name, month, pdf_path)
+            if self.format == "mbox":
+                path = self.write_mbox(message)
+            else:
+                path = self.write_eml(message, pdf_path)
+            return True, f"Exported to {path}"
+        except Exception as e:
+            return False, str(e)
+
+    def send_bulk(self, payslip_list, stop_event=None, progress_callback=None):
+        results = {"success": 0, "failed": 0, "errors": []}
+        try:
+            for i, p in enumerate(payslip_list):
+                if stop_event is not None and stop_event.is_set():
+                    break
+
+                ok, msg = self.send_payslip(p["email"], p["name"], p["month"], p["pdf"])
+                if ok:
+                    results["success"] += 1
+                else:
+                    results["failed"] += 1
+                    results["errors"].append({"email": p["email"], "error": msg})
+
+                if progress_callback:
+                    progress_callback(i + 1, len(payslip_list))
+        finally:
+            self.close()
+
         return results
 
+    def close(self):
+        with self.lock:
+            if self.mbox is not None:
+                self.mbox.close()
+                self.mbox = None
+
+
+def make_email_sender(settings: dict = None):
+    settings = settings or ConfigManager().load()
+    if settings["MAIL_BACKEND"] == "smtp":
+        return SmtpSender(settings)
+    if settings["MAIL_BACKEND"] == "export":
+        return MailExporter(settings)
+    return EmailSender()
+
+
 def send_payslip_email(recipient_email, employee_name, month, pdf_path):
-    return EmailSender().send_payslip(recipient_email, employee_name, month, pdf_path)
+    sender = make_email_sender()
+    try:
+        return sender.send_payslip(recipient_email, employee_name, month, pdf_path)
+    finally:
+        sender.close()
 
 
-def send_bulk_payslips(payslip_list):
-    return EmailSender().send_bulk(payslip_list)
+def send_bulk_payslips(payslip_list, stop_event=None, progress_callback=None):
+    return make_email_sender().send_bulk(payslip_list, stop_event=stop_event, progress_callback=progress_callback)
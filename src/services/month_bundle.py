@@ -0,0 +1,281 @@
+"""
+Month bundles for the bank and auditors: every payslip PDF of a month in one zip archive and/or one
+merged PDF with an outline entry per employee, written next to the month folders:
+    EMPLOYEE_PAYSLIPS_FOLDER/<year>/<Month>_<year>_Payslips.zip / .pdf
+
+Payslips are added one by one as they finish and copied straight to the bundle files, so only the
+payslip being added is ever in memory. The merged PDF needs pypdf (pip install pypdf), the zip does not.
+"""
+
+import logging
+import os
+import zipfile
+from datetime import datetime
+from pathlib import Path
+
+
+def bundle_filepath(settings: dict, month_no: int, year: int, suffix: str) -> Path:
+    month = datetime(1970, month_no, 1).strftime("%B")
+    return Path(settings["EMPLOYEE_PAYSLIPS_FOLDER"]) / str(year) / f"{month}_{year}_Payslips{suffix}"
+
+
+class StreamingPdfMerger:
+    """
+    Appends PDFs to one output file object by object: each source is parsed, its pages and the
+    objects they use are renumbered and written out, then the source is dropped. The page tree,
+    outline and cross-reference table are written by close().
+    """
+    PAGES_ID = 2
+
+    def __init__(self, filepath):
+        try:
+            import pypdf
+        except ImportError as e:
+            raise ImportError("Merged payslip PDFs need pypdf: pip install pypdf") from e
+        self.pypdf = pypdf
+
+        self.file    = open(filepath, "wb")
+        self.offsets = {}
+        self.next_id = 3           # 1: catalog, 2: page tree
+        self.entries = []          # (title, [page ids])
+        self.file.write(b"%PDF-1.7\n%\xe2\xe3\xcf\xd3\n")
+
+    def _new_id(self):
+        self.next_id += 1
+        return self.next_id - 1
+
+    def _write_object(self, object_id, obj):
+        self.offsets[object_id] = self.file.tell()
+        self.file.write(f"{object_id} 0 obj\n".encode())
+        obj.write_to_stream(self.file)
+        self.file.write(b"\nendobj\n")
+
+    def append(self, pdf_filepath, title):
+        generic = self.pypdf.generic
+        reader  = self.pypdf.PdfReader(pdf_filepath)
+        ids     = {}   # (source id, generation) -> id in the output
+        pending = []
+
+        def ref(indirect):
+            key = (indirect.idnum, indirect.generation)
+            if key not in ids:
+                ids[key] = self._new_id()
+                pending.append((ids[key], indirect))
+            return generic.IndirectObject(ids[key], 0, None)
+
+        def copy(obj):
+            if isinstance(obj, generic.IndirectObject):
+                return ref(obj)
+            if isinstance(obj, generic.StreamObject):
+                stream = generic.StreamObject()
+                stream._data = obj._data   # still encoded, copied as is
+                stream.update({key: copy(value) for key, value in obj.items() if key != "/Length"})
+                return stream
+            if isinstance(obj, generic.DictionaryObject):
+                return generic.DictionaryObject({key: copy(value) for key, value in obj.items()})
+            if isinstance(obj, generic.ArrayObject):
+                return generic.ArrayObject(copy(value) for value in obj)
+            return obj
+
+        # Pages first, so links back to a page (annotations) resolve to the copy, not the source page tree
+        pages = list(reader.pages)   # inherited attributes (MediaBox, Resources) are copied into each page
+        page_ids = []
+        for page in pages:
+            page_id = self._new_id()
+            page_ids.append(page_id)
+            if page.indirect_reference is not None:
+                ids[(page.indirect_reference.idnum, page.indirect_reference.generation)] = page_id
+
+        for page, page_id in zip(pages, page_ids):
+            page_copy = generic.DictionaryObject({key: copy(value) for key, value in page.items() if key != "/Parent"})
+            page_copy[generic.NameObject("/Parent")] = generic.IndirectObject(self.PAGES_ID, 0, None)
+            self._write_object(page_id, page_copy)
+
+        while pending:
+            object_id, indirect = pending.pop()
+            self._write_object(object_id, copy(indirect.get_object()))
+
+        self.entries.append((title, page_ids))
+
+    def close(self, sort=True):
+        """Writes the page tree and outline (by title when `sort`, else in order added) and closes the file."""
+        generic = self.pypdf.generic
+        entries = sorted(self.entries, key=lambda entry: entry[0].lower()) if sort else self.entries
+
+        kids = [page_id for _, page_ids in entries for page_id in page_ids]
+        self._write_object(self.PAGES_ID, generic.DictionaryObject({
+            generic.NameObject("/Type") : generic.NameObject("/Pages"),
+            generic.NameObject("/Kids") : generic.ArrayObject(generic.IndirectObject(page_id, 0, None) for page_id in kids),
+            generic.NameObject("/Count"): generic.NumberObject(len(kids)),
+        }))
+
+        catalog = generic.DictionaryObject({
+            generic.NameObject("/Type") : generic.NameObject("/Catalog"),
+            generic.NameObject("/Pages"): generic.IndirectObject(self.PAGES_ID, 0, None),
+        })
+
+        entries = [entry for entry in entries if entry[1]]
+        if entries:
+            outline_id = self._new_id()
+            item_ids   = [self._new_id() for _ in entries]
+
+            for i, ((title, page_ids), item_id) in enumerate(zip(entries, item_ids)):
+                item = generic.DictionaryObject({
+                    generic.NameObject("/Title") : generic.create_string_object(title),
+                    generic.NameObject("/Parent"): generic.IndirectObject(outline_id, 0, None),
+                    generic.NameObject("/Dest")  : generic.ArrayObject([generic.IndirectObject(page_ids[0], 0, None), generic.NameObject("/Fit")]),
+                })
+                if i > 0:
+                    item[generic.NameObject("/Prev")] = generic.IndirectObject(item_ids[i - 1], 0, None)
+                if i < len(item_ids) - 1:
+                    item[generic.NameObject("/Next")] = generic.IndirectObject(item_ids[i + 1], 0, None)
+                self._write_object(item_id, item)
+
+            self._write_object(outline_id, generic.DictionaryObject({
+                generic.NameObject("/Type") : generic.NameObject("/Outlines"),
+                generic.NameObject("/First"): generic.IndirectObject(item_ids[0], 0, None),
+                generic.NameObject("/Last") : generic.IndirectObject(item_ids[-1], 0, None),
+                generic.NameObject("/Count"): generic.NumberObject(len(item_ids)),
+            }))
+            catalog[generic.NameObject("/Outlines")] = generic.IndirectObject(outline_id, 0, None)
+            catalog[generic.NameObject("/PageMode")] = generic.NameObject("/UseOutlines")
+
+        self._write_object(1, catalog)
+
+        xref_offset = self.file.tell()
+        self.file.write(f"xref\n0 {self.next_id}\n0000000000 65535 f \n".encode())
+        for object_id in range(1, self.next_id):
+            if object_id in self.offsets:
+                self.file.write(f"{self.offsets[object_id]:010d} 00000 n \n".encode())
+            else:
+                self.file.write(b"0000000000 00000 f \n")
+        self.file.write(f"trailer\n<< /Size {self.next_id} /Root 1 0 R >>\nstartxref\n{xref_offset}\n%%EOF\n".encode())
+        self.file.close()
+
+    def abort(self):
+        self.file.close()
+
+
+class MonthBundle:
+    """
+    Collects one month's payslip PDFs into a zip and/or a merged PDF while they are generated.
+    add() takes payslips in any order; a PDF still being converted (quick mode, `pending`) is only read by finish(),
+    which must be called once the conversions are done.
+    Bundles are written under a temporary name and only replace the previous ones when finish() succeeds.
+    """
+    def __init__(self, settings: dict, month_no: int, year: int, pdf=True, zip=True):
+        assert pdf or zip, "A month bundle needs at least one of pdf or zip"
+        self.month   = datetime(1970, month_no, 1).strftime("%B")
+        self.paths   = {}
+        self.merger  = None
+        self.archive = None
+        self.waiting = []     # (pdf path, title) whose PDF does not exist yet
+        self.added   = set()
+        self.count   = 0
+
+        if pdf:
+            self.paths[".pdf"] = bundle_filepath(settings, month_no, year, ".pdf")
+        if zip:
+            self.paths[".zip"] = bundle_filepath(settings, month_no, year, ".zip")
+
+        next(iter(self.paths.values())).parent.mkdir(parents=True, exist_ok=True)
+        try:
+            if pdf:
+                self.merger = StreamingPdfMerger(self._tmp(".pdf"))
+            if zip:
+                # Payslip PDFs are already compressed, deflating them again costs time for nothing
+                self.archive = zipfile.ZipFile(self._tmp(".zip"), "w", compression=zipfile.ZIP_STORED)
+        except BaseException:
+            self.abort()
+            raise
+
+    def _tmp(self, suffix):
+        path = self.paths[suffix]
+        return path.with_name(path.name + ".tmp")
+
+    def add(self, pdf_filepath, title=None, pending=False):
+        pdf_path = Path(pdf_filepath)
+        title    = title or payslip_title(pdf_path, self.month)
+
+        # A PDF being converted may be half written, or an earlier run's: never read it now
+        if pending or not pdf_path.exists():
+            self.waiting.append((pdf_path, title))
+            return
+        if pdf_path in self.added:
+            return
+
+        if self.archive is not None:
+            self.archive.write(pdf_path, arcname=pdf_path.name)   # copied in chunks, never read whole
+        if self.merger is not None:
+            self.merger.append(str(pdf_path), title)
+        self.added.add(pdf_path)
+        self.count += 1
+
+    def finish(self):
+        """Adds the payslips that were still converting, then puts the bundles in place. Returns their paths."""
+        for pdf_path, title in self.waiting:
+            if pdf_path.exists():
+                self.add(pdf_path, title)
+            else:
+                logging.warning(f"{pdf_path} was not generated, it is missing from the {self.month} bundle")
+        self.waiting = []
+
+        if self.archive is not None:
+            self.archive.close()
+            self.archive = None
+        if self.merger is not None:
+            self.merger.close()
+            self.merger = None
+
+        for suffix, path in self.paths.items():
+            os.replace(self._tmp(suffix), path)
+        return [str(path) for path in self.paths.values()]
+
+    def abort(self):
+        """Drops the unfinished bundles, the previous ones (if any) stay."""
+        if self.archive is not None:
+            self.archive.close()
+            self.archive = None
+        if self.merger is not None:
+            self.merger.abort()
+            self.merger = None
+        for suffix in self.paths:
+            self._tmp(suffix).unlink(missing_ok=True)
+
+
+def pypdf_available():
+    try:
+        import pypdf  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+def payslip_title(pdf_path: Path, month: str) -> str:
+    """'Ama_Mensah_January_Payslip.pdf' -> 'Ama Mensah'"""
+    name = pdf_path.stem
+    suffix = f"_{month}_Payslip"
+    if name.endswith(suffix):
+        name = name[:-len(suffix)]
+    return name.replace("_", " ")
+
+
+def bundle_month(settings: dict, month_no: int, year: int, pdf=True, zip=True, progress_callback=None):
+    """
+    Bundles the payslip PDFs already in EMPLOYEE_PAYSLIPS_FOLDER/<year>/<Month>.
+    progress_callback(counter, total) after each payslip. Returns the bundle paths.
+    """
+    bundle = MonthBundle(settings, month_no, year, pdf=pdf, zip=zip)
+    month_folder = Path(settings["EMPLOYEE_PAYSLIPS_FOLDER"]) / str(year) / bundle.month
+    pdf_paths = sorted(month_folder.glob("*.pdf"))
+
+    try:
+        assert pdf_paths, f"No {bundle.month} {year} payslip PDFs in {month_folder}"
+        for counter, pdf_path in enumerate(pdf_paths, start=1):
+            bundle.add(pdf_path)
+            if progress_callback:
+                progress_callback(counter, len(pdf_paths))
+        return bundle.finish()
+    except BaseException:
+        bundle.abort()
+        raise
@@ -1,30 +1,35 @@
-from src.config_manager import ConfigManager
+from src.config_manager import ConfigManager, ConfigError, validate_config
 from datetime import datetime
-from src.services.tax_calc import ghana_tax_calculator, format_ghs
-from src.services.db import YTD_Tracker
-from openpyxl import load_workbook
+from src.services.tax_calc import ghana_tax_calculator, ghana_tax_calculator_cached, tax_cache_info, get_tax_schedule, format_ghs
+import logging
+from src.services.db import YTD_Tracker, PayslipManifest
+from src.services.pdf_conversion import make_converter, ConversionError, ConversionQueue
+from src.services.pdf_renderer import PdfRenderer, payslip_layouts
+from src.services.template_cache import payslip_templates
+from src.services.employee_workbook import EmployeeWorkbook
+from src.services.row_cache import MonthRowCache
+from src.services.tracing import NULL_TRACER, Tracer, BufferSink, make_tracer
+from src.services.month_bundle import MonthBundle, bundle_month
 from pathlib import Path
-import shutil
-import subprocess
-from threading import Thread
+import hashlib
+import json
+import multiprocessing
+import multiprocessing.util
+from concurrent.futures import ProcessPoolExecutor, as_completed
 
 class Column_header:
     def __init__(self, **kwargs):
-        self.employee_sheet = kwargs.get("spreadsheet", None)
-        self.header         = kwargs.get("header", "").strip()
-        self.column         = None
-        self.column_index   = None
+        self.headers      = kwargs.get("headers", [])  # row 1 values of the employee sheet
+        self.header       = kwargs.get("header", "").strip()
+        self.column       = None
+        self.column_index = None
         self.search_header()
 
     def search_header(self):
-        headers        = [cell.value.strip() for cell in self.employee_sheet[1]]
-        header_columns = [cell.column for cell in self.employee_sheet[1]]
-
         if (self.header and
-            self.header in headers):
-            chosen_index = headers.index(self.header)
-            self.column  = header_columns[chosen_index]
-            self.column_index = self.column -1
+            self.header in self.headers):
+            self.column_index = self.headers.index(self.header)
+            self.column       = self.column_index +1
         else:
             self.column = None
             self.column_index = None
@@ -46,6 +51,130 @@ def last_date_of_month(month_num, year):
 
     return year, month_num, day
 
+class PayslipRenderer:
+    """
+    Turns filled template cell dicts into payslip files:
+    xlsx copy of the template converted by LibreOffice, or a PDF drawn natively (PAYSLIP_RENDERER).
+    """
+    def __init__(self, settings: dict, month_no: int, year: int, tracer=NULL_TRACER):
+        self.settings = settings
+        self.month    = datetime(1970, month_no, 1).strftime("%B")
+        self.year     = year
+        self.tracer   = tracer
+        self.converter        = None
+        self.conversion_queue = None   # quick mode: PDF_CONVERTER_INSTANCES conversions at once, in the background
+        self.conversion_errors = []    # quick-mode conversions that failed
+        self.converted         = []    # quick-mode payslip infos whose PDF has been produced, see take_converted()
+
+    def render(self, payslip_details: dict):
+        name = payslip_details['name']['value']
+        staff_number = payslip_details['staff_number']['value']
+
+        if self.settings["PAYSLIP_RENDERER"] == "native":
+            with self.tracer.span("pdf", staff_number=staff_number):
+                payslip_pdf_filepath = self.write_payslip_pdf(payslip_details)
+            assert payslip_pdf_filepath, f"For {self.month}, {name}, failed to render payslip pdf from the template"
+
+            return {
+                "details"      : payslip_details,
+                "xlsx_filepath": None,
+                "pdf_filepath" : payslip_pdf_filepath,
+                "pdf_pending"  : False
+            }
+
+        with self.tracer.span("xlsx", staff_number=staff_number):
+            payslip_xlsx_filepath = self.write_payslip_xlsx(payslip_details)
+        assert payslip_xlsx_filepath, f"For {self.month}, {name}, we  failed to create a payslip spreadsheet from the template"
+
+        bg = self.settings['QUICK_MODE_ENABLED']
+        payslip_info = {
+            "details"      : payslip_details,
+            "xlsx_filepath": payslip_xlsx_filepath,
+            "pdf_filepath" : None,
+            "pdf_pending"  : bg   # quick mode: queued, the PDF exists once close() has returned
+        }
+        payslip_info["pdf_filepath"] = self.spreadsheet_to_pdf(payslip_xlsx_filepath, bg=bg, staff_number=staff_number,
+                                                               on_converted=lambda: self.converted.append(payslip_info))
+        assert payslip_info["pdf_filepath"], f"For {self.month}, {name}, failed to convert payslip spreadsheet to pdf"
+
+        return payslip_info
+
+    def payslip_filepath(self, payslip_details: dict, suffix: str):
+        output_dir = Path(self.settings["EMPLOYEE_PAYSLIPS_FOLDER"]) / str(self.year) / str(self.month)
+        output_dir.mkdir(parents=True, exist_ok=True)
+        return output_dir / f"{payslip_details['name']['value'].replace(' ', '_')}_{self.month}_Payslip{suffix}"
+
+    def write_payslip_pdf(self, payslip_details: dict):
+        """Native renderer: template layout parsed once per template file, PDF written straight from Python."""
+        layout = payslip_layouts.get(self.settings["PAYSLIP_TEMPLATE_FILEPATH"])
+        return PdfRenderer(layout).render(payslip_details, self.payslip_filepath(payslip_details, ".pdf"))
+
+    def write_payslip_xlsx(self, payslip_details: dict):
+        output_path = self.payslip_filepath(payslip_details, ".xlsx")
+
+        template = payslip_templates.get(self.settings["PAYSLIP_TEMPLATE_FILEPATH"])
+        output_path.write_bytes(template.render(payslip_details))
+
+        return str(output_path)
+
+    def spreadsheet_to_pdf(self, spreadsheet_filepath, bg=True, staff_number=None, on_converted=None):
+        """Converts now, or queues the conversion when `bg`; on_converted() is called once a queued PDF exists."""
+        spreadsheet_path = Path(spreadsheet_filepath)
+        pdf_path = spreadsheet_path.with_suffix('.pdf')
+
+        tracer = self.tracer
+
+        def convert(converter):
+            # The converter times out, retries and gives up with ConversionError, it never spins
+            with tracer.span("pdf", staff_number=staff_number):
+                converter.convert(spreadsheet_path)
+            if not pdf_path.exists():
+                raise ConversionError(f"Could not convert {spreadsheet_path.name} to PDF")
+            if bg and on_converted:
+                on_converted()
+
+        if bg:
+            if self.conversion_queue is None:
+                self.conversion_queue = ConversionQueue(self.settings)
+            # A previous run's PDF must not pass for this one while the conversion waits (or gets cancelled)
+            pdf_path.unlink(missing_ok=True)
+            self.conversion_queue.submit(convert)  # waits while the queue is full
+            return str(pdf_path)
+
+        if self.converter is None:
+            # One document at a time here (and in each parallel worker process): one LibreOffice instance
+            self.converter = make_converter(self.settings, instances=1)
+        convert(self.converter)
+        return str(pdf_path) if pdf_path.exists() else None
+
+    def close(self, cancel=False):
+        """
+        Waits for the queued quick-mode conversions, so every PDF exists once it returns
+        (unless `cancel`: the conversions not started yet are dropped), then shuts the converters down.
+        """
+        if self.conversion_queue is not None:
+            dropped = self.conversion_queue.close(cancel=cancel)
+            if dropped:
+                logging.warning(f"{self.month} {self.year}: {len(dropped)} queued PDF conversion(s) cancelled")
+            self.conversion_errors += self.conversion_queue.errors
+            self.conversion_queue = None
+
+        if self.converter is not None:
+            self.converter.close()
+            self.converter = None
+
+    def take_converted(self):
+        """The quick-mode payslip infos converted since the last call; call after close(), which awaits them."""
+        converted, self.converted = self.converted, []
+        return converted
+
+    def check_conversions(self):
+        """Raises ConversionError for the background conversions that failed (once awaited by close())."""
+        if self.conversion_errors:
+            errors, self.conversion_errors = self.conversion_errors, []
+            more = f"\n... and {len(errors) - 5} more" if len(errors) > 5 else ""
+            raise ConversionError(f"{len(errors)} payslip PDF(s) could not be created:\n" + "\n".join(errors[:5]) + more)
+
 class PayslipGenerator:
     def __init__(self, month_no: int, year: int, **kwargs):
         """
@@ -55,8 +184,12 @@ class PayslipGenerator:
         Iterates over every non-empty row of "employee data".
         Fills payslip template file.
         """
-        self.settings = ConfigManager().load()
+        # Own copy: callers may pass a config with per-run overrides (CLI), validated like config.json
+        self.settings = validate_config(kwargs.get("config") or ConfigManager().load())
         self.progress_callback = kwargs.get("progress_callback", None)
+        self.tracer       = kwargs.get("tracer", None) or make_tracer(self.settings)  # a caller's tracer can span several months
+        self.owns_tracer  = "tracer" not in kwargs or kwargs["tracer"] is None
+        self.trace_summary = {}
         self.counter = 0
         self.total   = 0
 
@@ -65,31 +198,55 @@ class PayslipGenerator:
         self.month_no       = month_no
         self.month          = datetime(1970, month_no, 1).strftime("%B")
         self.year           = year
-        self.employee_sheet = None
+        self.tax_schedule   = get_tax_schedule(year)
+        self.money_fields   = set(ghana_tax_calculator(0, 0, schedule=self.tax_schedule))  # pesewa fields to format as GHS
+        self.employee_workbook = kwargs.get("employee_workbook", None)  # shared EmployeeWorkbook across months
+        self.owns_workbook     = self.employee_workbook is None
+        self.employee_sheet    = None   # row 1 values of this month's sheet
+        self.row_cache         = None   # MonthRowCache of this month's sheet (ROW_CACHE_ENABLED)
+        self.cached_rows       = None   # (rows below the header, non-empty rows) when the cache was valid
         self.employee_sheet_headers = None
         self.template_sheet_cells   = None
         self.start_datetime_str = datetime(*first_date_of_month(month_no, year)).strftime("%d/%m/%Y")
         self.end_datetime_str   = datetime(*last_date_of_month(month_no, year)).strftime("%d/%m/%Y")
-
-        self.load_employee_sheet()
+        self.renderer       = PayslipRenderer(self.settings, month_no, year, tracer=self.tracer)
+        self.ytd_tracker    = YTD_Tracker(tracer=self.tracer)
+        self.manifest       = PayslipManifest()
+        self.manifest_entries   = None  # {staff_number: (fingerprint, xlsx, pdf)} of the previous run, loaded on first use
+        self.render_fingerprint = None
+        self.fingerprints       = {}    # staff_number -> fingerprint of this run's payslips
+        self.rendered           = []    # manifest rows of the payslips rendered by this run
+        self.skipped            = 0
+        self.bundle             = None  # MonthBundle fed while payslips finish (BUNDLE_PDF_ENABLED / BUNDLE_ZIP_ENABLED)
+        self.bundle_filepaths   = []
+
+        with self.tracer.span("load", month_no=month_no, year=year):
+            self.load_employee_sheet()
         self._init_employee_sheet_headers()
+        self._check_employee_sheet_headers()
         self._init_template_sheet_cells()
 
     def _init_employee_sheet_headers(self):
         # Find (important) Column Headers
         self.employee_sheet_headers = {
-            "name"           : Column_header(spreadsheet=self.employee_sheet, header=self.settings["EMPLOYEE_NAME_HEADER"]),
-            "staff_number"   : Column_header(spreadsheet=self.employee_sheet, header=self.settings["EMPLOYEE_STAFF_NUMBER_HEADER"]),
-            "email"          : Column_header(spreadsheet=self.employee_sheet, header=self.settings["EMPLOYEE_EMAIL_HEADER"]),
-            "tin"            : Column_header(spreadsheet=self.employee_sheet, header=self.settings["EMPLOYEE_TIN_HEADER"]),
-            "position"       : Column_header(spreadsheet=self.employee_sheet, header=self.settings["EMPLOYEE_POSITION_HEADER"]),
-            "department"     : Column_header(spreadsheet=self.employee_sheet, header=self.settings["EMPLOYEE_DEPARTMENT_HEADER"]),
-            "account_number" : Column_header(spreadsheet=self.employee_sheet, header=self.settings["EMPLOYEE_ACCOUNT_NUMBER_HEADER"]),
-            "gross_income"   : Column_header(spreadsheet=self.employee_sheet, header=self.settings["EMPLOYEE_GROSS_INCOME_HEADER"]),
-            "untaxed_bonus"  : Column_header(spreadsheet=self.employee_sheet, header=self.settings["EMPLOYEE_UNTAXED_BONUS_HEADER"]),
-            "extra_deduction": Column_header(spreadsheet=self.employee_sheet, header=self.settings["EMPLOYEE_EXTRA_DEDUCTION_HEADER"])
+            "name"           : Column_header(headers=self.employee_sheet, header=self.settings["EMPLOYEE_NAME_HEADER"]),
+            "staff_number"   : Column_header(headers=self.employee_sheet, header=self.settings["EMPLOYEE_STAFF_NUMBER_HEADER"]),
+            "email"          : Column_header(headers=self.employee_sheet, header=self.settings["EMPLOYEE_EMAIL_HEADER"]),
+            "tin"            : Column_header(headers=self.employee_sheet, header=self.settings["EMPLOYEE_TIN_HEADER"]),
+            "position"       : Column_header(headers=self.employee_sheet, header=self.settings["EMPLOYEE_POSITION_HEADER"]),
+            "department"     : Column_header(headers=self.employee_sheet, header=self.settings["EMPLOYEE_DEPARTMENT_HEADER"]),
+            "account_number" : Column_header(headers=self.employee_sheet, header=self.settings["EMPLOYEE_ACCOUNT_NUMBER_HEADER"]),
+            "gross_income"   : Column_header(headers=self.employee_sheet, header=self.settings["EMPLOYEE_GROSS_INCOME_HEADER"]),
+            "untaxed_bonus"  : Column_header(headers=self.employee_sheet, header=self.settings["EMPLOYEE_UNTAXED_BONUS_HEADER"]),
+            "extra_deduction": Column_header(headers=self.employee_sheet, header=self.settings["EMPLOYEE_EXTRA_DEDUCTION_HEADER"])
         }
 
+    def _check_employee_sheet_headers(self):
+        """Every configured header must be a column of this month's sheet: fail before the first employee, not midway."""
+        missing = [column.header for column in self.employee_sheet_headers.values() if column.header and column.column is None]
+        if missing:
+            raise ConfigError(f"The '{self.month}' sheet has no {', '.join(repr(header) for header in missing)} column in row 1, check the headers in Settings")
+
     def _init_template_sheet_cells(self):
         self.template_sheet_cells = {
             "payslip_date": {
@@ -195,50 +352,61 @@ class PayslipGenerator:
         }
 
     def load_employee_sheet(self):
-        try:
-            wb = load_workbook(self.employee_sheet_filepath)
-            self.employee_sheet = wb[self.month]
-            return self.employee_sheet
-        except Exception as e:
-            return -1
+        if self.employee_workbook is None:
+            self.employee_workbook = EmployeeWorkbook(self.employee_sheet_filepath)
+
+        if self.settings["ROW_CACHE_ENABLED"]:
+            header_settings = [self.settings[key] for key in sorted(self.settings) if key.startswith("EMPLOYEE_") and key.endswith("_HEADER")]
+            self.row_cache = MonthRowCache(self.employee_workbook.filepath, self.month, header_settings)
+            cached = self.row_cache.load()
+            if cached is not None:
+                self.employee_sheet, total, rows = cached
+                self.cached_rows = (total, rows)
+                return self.employee_sheet
+
+        assert self.month in self.employee_workbook.sheetnames, f"The employee spreadsheet has no '{self.month}' sheet"
+        self.employee_sheet = self.employee_workbook.header(self.month)
+        return self.employee_sheet
 
     def employee_sheet_rows_iter(self):
-        header = True
-        for row in self.employee_sheet:
-            if header:
-                header = False
-            else:
-                yield row
+        # Read-only rows stop at the last filled cell, pad them to the header width
+        width = len(self.employee_sheet)
+        for row in self.employee_workbook.rows(self.month):
+            yield row + (None,) * (width - len(row)) if len(row) < width else row
 
-    def generate_payslip(self, employee_sheet_row):
+    def employee_entry(self, employee_sheet_row):
+        """Maps a sheet row onto the employee fields, validates it and adds the tax figures (pesewas)."""
         employee_entry = self.employee_sheet_headers.copy()
 
         for k, v in employee_entry.items():
-            employee_entry[k] = employee_sheet_row[v.column_index].value if v.column else None
+            employee_entry[k] = employee_sheet_row[v.column_index] if v.column else None
 
         assert type(employee_entry["staff_number"]) == int, f"For {self.month}, {employee_entry['name']} has no proper {self.settings['EMPLOYEE_STAFF_NUMBER_HEADER']} (it must be a number)"
         assert type(employee_entry["gross_income"]) in [int, float], f"For {self.month}, {employee_entry['name']} has no valid {self.settings['EMPLOYEE_GROSS_INCOME_HEADER']} in the employee spreadsheet at least put 0 there"
         assert type(employee_entry["untaxed_bonus"]) in [int, float], f"For {self.month}, {employee_entry['name']} has no valid {self.settings['EMPLOYEE_UNTAXED_BONUS_HEADER']} in the employee spreadsheet at least put 0 there"
         assert type(employee_entry["extra_deduction"]) in [int, float], f"For {self.month}, {employee_entry['name']} has no valid {self.settings['EMPLOYEE_EXTRA_DEDUCTION_HEADER']} in the employee spreadsheet at least put 0 there"
 
-        employee_entry.update(
-            ghana_tax_calculator(
-                int(employee_entry["gross_income"] *100),
-                int(employee_entry["untaxed_bonus"] *100),
-                int(employee_entry["extra_deduction"] *100)
-            ).items()
-        )
+        with self.tracer.span("tax", staff_number=employee_entry["staff_number"]):
+            employee_entry.update(
+                ghana_tax_calculator_cached(
+                    int(employee_entry["gross_income"] *100),
+                    int(employee_entry["untaxed_bonus"] *100),
+                    int(employee_entry["extra_deduction"] *100),
+                    schedule=self.tax_schedule
+                ).items()
+            )
 
-        ytd_tracker = YTD_Tracker()
-        ytd_tracker.set_month_record(self.month_no, self.year, employee_entry)
-        employee_entry.update(ytd_tracker.get_cumulative_ytd(self.month_no, self.year, employee_entry))
+        return employee_entry
 
+    def payslip_details(self, employee_entry):
+        """Fills a copy of the template cells from a taxed employee entry that carries its YTD totals."""
         # Convert monetary fields from pesewas to GHS for export
         for k, v in employee_entry.items():
-            if (k in list(ghana_tax_calculator(0,0).keys()) or "ytd" in k):
+            if (k in self.money_fields or "ytd" in k):
                 employee_entry[k] = format_ghs(pesewa_amount=v, prefix=self.settings["MONEY_PREFIX"])
 
-        payslip_details = self.template_sheet_cells.copy()
+        # One copy per payslip, the details may outlive this call (worker processes, progress callbacks)
+        payslip_details = {k: v.copy() for k, v in self.template_sheet_cells.items()}
 
         for k,v in payslip_details.items():
             if "payslip" in k:
@@ -249,89 +417,238 @@ class PayslipGenerator:
             else:
                 v['value'] = employee_entry[k]
 
-        payslip_xlsx_filepath = self.write_payslip_xlsx(payslip_details)
-        assert payslip_xlsx_filepath, f"For {self.month}, {employee_entry['name']}, we  failed to create a payslip spreadsheet from the template"
+        return payslip_details
 
-        payslip_pdf_filepath = self.spreadsheet_to_pdf(payslip_xlsx_filepath, bg=self.settings['QUICK_MODE_ENABLED'])
-        assert payslip_pdf_filepath, f"For {self.month}, {employee_entry['name']}, failed to convert payslip spreadsheet to pdf"
+    def prepare_payslip(self, employee_sheet_row):
+        """Tax calculation + YTD bookkeeping for one row. Returns the filled template cell dict."""
+        employee_entry = self.employee_entry(employee_sheet_row)
 
-        return {
-            "details"      : payslip_details,
-            "xlsx_filepath": payslip_xlsx_filepath,
-            "pdf_filepath" : payslip_pdf_filepath
-        }
+        self.ytd_tracker.set_month_record(self.month_no, self.year, employee_entry)
+        employee_entry.update(self.ytd_tracker.get_cumulative_ytd(self.month_no, self.year, employee_entry))
 
-    def write_payslip_xlsx(self, payslip_details: dict):
-        output_dir = Path(self.settings["EMPLOYEE_PAYSLIPS_FOLDER"]) / str(self.year) / str(self.month)
-        output_dir.mkdir(parents=True, exist_ok=True)
-        output_path = output_dir / f"{payslip_details['name']['value'].replace(' ', '_')}_{self.month}_Payslip.xlsx"
+        return self.payslip_details(employee_entry)
 
-        shutil.copy2(self.settings["PAYSLIP_TEMPLATE_FILEPATH"], output_path)
+    def prepare_payslips(self, employee_sheet_rows):
+        """
+        prepare_payslip for a whole month: one transaction for the YTD records
+        and one grouped query for the cumulative totals.
+        """
+        employee_entries = [self.employee_entry(row) for row in employee_sheet_rows]
 
-        wb = load_workbook(output_path)
-        ws = wb.active
+        self.ytd_tracker.set_month_records(self.month_no, self.year, employee_entries)
+        ytd_totals = self.ytd_tracker.get_cumulative_ytd_bulk(self.month_no, self.year)
 
-        # Capture & Re-add images (Openpyxl fails to keep them by default)
-        images = list(ws._images)
-        ws._images.clear()
+        payslips = []
+        for employee_entry in employee_entries:
+            employee_entry.update(ytd_totals[employee_entry["staff_number"]])
+            with self.tracer.span("format", staff_number=employee_entry["staff_number"]):
+                payslips.append(self.payslip_details(employee_entry))
 
-        for img in images:
-            ws.add_image(img)
+        return payslips
 
-        for v in payslip_details.values():
-            if v['location']:
-                ws[v['location']] = v['value']
+    def generate_payslip(self, employee_sheet_row):
+        return self.renderer.render(self.prepare_payslip(employee_sheet_row))
 
-        wb.save(output_path)
-        wb.close()
+    def write_payslip_pdf(self, payslip_details: dict):
+        return self.renderer.write_payslip_pdf(payslip_details)
 
-        return str(output_path)
+    def write_payslip_xlsx(self, payslip_details: dict):
+        return self.renderer.write_payslip_xlsx(payslip_details)
 
     def spreadsheet_to_pdf(self, spreadsheet_filepath, bg=True):
-        spreadsheet_path = Path(spreadsheet_filepath)
-        pdf_path = spreadsheet_path.with_suffix('.pdf')
+        return self.renderer.spreadsheet_to_pdf(spreadsheet_filepath, bg=bg)
 
-        def convert():
-            pending = True
+    def payslip_fingerprint(self, payslip_details: dict) -> str:
+        """
+        Hash of everything a payslip file is made from: the filled cells (row values, tax, YTD,
+        money prefix, cell locations), the template file's content, the renderer and the output folder.
+        """
+        if self.render_fingerprint is None:
+            with open(self.settings["PAYSLIP_TEMPLATE_FILEPATH"], "rb") as f:
+                template_hash = hashlib.sha256(f.read()).hexdigest()
+            self.render_fingerprint = [template_hash, self.settings["PAYSLIP_RENDERER"], str(self.settings["EMPLOYEE_PAYSLIPS_FOLDER"])]
 
-            while pending:
-                subprocess.run(['rm', pdf_path], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        payload = json.dumps([self.render_fingerprint, payslip_details], sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode()).hexdigest()
 
-                result = subprocess.run(
-                    ["soffice", "--headless", "--convert-to", "pdf",
-                     "--outdir", str(spreadsheet_path.parent), str(spreadsheet_path)],
-                    stdout=subprocess.DEVNULL,
-                    stderr=subprocess.DEVNULL,
-                )
+    def unchanged_payslip(self, payslip_details: dict):
+        """
+        Fingerprints the payslip; returns the previous run's payslip info when it is unchanged
+        and its PDF is still there (INCREMENTAL_MODE_ENABLED), else None: it needs rendering.
+        """
+        staff_number = payslip_details['staff_number']['value']
+        with self.tracer.span("fingerprint", staff_number=staff_number):
+            fingerprint = self.fingerprints[staff_number] = self.payslip_fingerprint(payslip_details)
 
-                pending = not pdf_path.exists()
+        if not self.settings["INCREMENTAL_MODE_ENABLED"]:
+            return None
 
-        if bg:
-            Thread(target=convert, daemon=True).start()
-            return str(pdf_path)
-        else:
-            convert()
-            return str(pdf_path) if pdf_path.exists() else None
+        if self.manifest_entries is None:
+            self.manifest_entries = self.manifest.get_month(self.month_no, self.year)
+
+        previous = self.manifest_entries.get(staff_number)
+        if previous is None or previous[0] != fingerprint or not Path(previous[2]).exists():
+            return None
+
+        self.skipped += 1
+        return {
+            "details"      : payslip_details,
+            "xlsx_filepath": previous[1],
+            "pdf_filepath" : previous[2]
+        }
+
+    def _payslip_rendered(self, payslip_info):
+        staff_number = payslip_info['details']['staff_number']['value']
+        self.rendered.append((staff_number, self.fingerprints[staff_number], payslip_info['xlsx_filepath'], payslip_info['pdf_filepath']))
+
+    def _record_conversions(self):
+        """Quick mode: records the payslips whose queued conversion has produced the PDF, once the renderer is closed."""
+        for payslip_info in self.renderer.take_converted():
+            self._payslip_rendered(payslip_info)
 
     def generate_payslips(self):
-        employee_spreadsheet_rows = list( self.employee_sheet_rows_iter() )
+        try:
+            with self.tracer.span("month", month_no=self.month_no, year=self.year):
+                if self.settings["BUNDLE_PDF_ENABLED"] or self.settings["BUNDLE_ZIP_ENABLED"]:
+                    self.bundle = MonthBundle(self.settings, self.month_no, self.year,
+                                              pdf=self.settings["BUNDLE_PDF_ENABLED"], zip=self.settings["BUNDLE_ZIP_ENABLED"])
+
+                workers = int(self.settings["PARALLEL_WORKERS"] or 1)
+                if workers > 1:
+                    self._generate_payslips_parallel(workers)
+                else:
+                    self._generate_payslips()
+                # inside the span: quick-mode conversions finish here, "done" means every PDF exists
+                self.renderer.close()
+                self._record_conversions()
+                self.renderer.check_conversions()
+
+                if self.bundle is not None:
+                    with self.tracer.span("bundle", month_no=self.month_no, year=self.year):
+                        self.bundle_filepaths = self.bundle.finish()
+                    self.bundle = None
+        finally:
+            if self.bundle is not None:
+                self.bundle.abort()
+                self.bundle = None
+            self.renderer.close(cancel=True)  # no-op after a complete run
+            self._record_conversions()
+            logging.info(f"{self.month} {self.year} tax cache: {tax_cache_info()}")
+            logging.info(f"{self.month} {self.year}: {len(self.rendered)} payslips rendered, {self.skipped} unchanged")
+            # Whatever got rendered (PDF on disk) is recorded, even when the run stopped halfway
+            self.manifest.set_entries(self.month_no, self.year, self.rendered)
+            if self.owns_workbook:
+                self.employee_workbook.close()
+            self._finish_trace()
+
+    def bundle_month(self, pdf=True, zip=True, progress_callback=None):
+        """Bundles the month's payslip PDFs already on disk (see month_bundle), e.g. after a run without bundling."""
+        self.bundle_filepaths = bundle_month(self.settings, self.month_no, self.year, pdf=pdf, zip=zip, progress_callback=progress_callback)
+        return self.bundle_filepaths
+
+    def _finish_trace(self):
+        if not self.tracer.enabled:
+            return
+
+        self.trace_summary = self.tracer.summary()
+        self.tracer.emit({"event": "summary", "month_no": self.month_no, "year": self.year, "stages": self.trace_summary})
+        for stage, stats in self.trace_summary.items():
+            logging.info(f"{self.month} {self.year} {stage}: {stats}")
+        if self.owns_tracer:
+            self.tracer.close()
+
+    def _employee_rows(self):
+        if self.cached_rows is not None:
+            total, rows = self.cached_rows
+        else:
+            # openpyxl reads the rows lazily: materialised here, so the parsing is timed
+            with self.tracer.span("parse", month_no=self.month_no, year=self.year):
+                employee_spreadsheet_rows = list( self.employee_sheet_rows_iter() )
+                total = len(employee_spreadsheet_rows)
+                rows  = [row for row in employee_spreadsheet_rows if any(value is not None for value in row)]
+
+            if self.row_cache is not None:
+                column_indexes = [column.column_index for column in self.employee_sheet_headers.values() if column.column]
+                self.row_cache.store(self.employee_sheet, total, rows, column_indexes)
+
+        assert total, f"For {self.month}, no employee payroll records exist"
+        self.total += total
+
+        yield from rows
+
+    def _report_progress(self, payslip_info):
+        self.counter += 1
+
+        if self.bundle is not None:
+            self.bundle.add(payslip_info['pdf_filepath'], payslip_info['details']['name']['value'],
+                            pending=payslip_info.get('pdf_pending', False))
+
+        if self.progress_callback:
+            self.progress_callback(
+                counter=self.counter,
+                total=self.total,
+                name=payslip_info['details']['name']['value'],
+                email=payslip_info['details']['email']['value'],
+                month=self.month,
+                payslip_filepath=payslip_info['pdf_filepath']
+            )
+
+    def _generate_payslips(self):
+        for payslip_details in self.prepare_payslips(self._employee_rows()):
+            payslip_info = self.unchanged_payslip(payslip_details)
+            if payslip_info is None:
+                payslip_info = self.renderer.render(payslip_details)
+                if not payslip_info["pdf_pending"]:
+                    self._payslip_rendered(payslip_info)
+            self._report_progress(payslip_info)
+
+    def _generate_payslips_parallel(self, workers: int):
+        """
+        Tax + YTD stay in this process (the only SQLite writer, rows in sheet order);
+        xlsx writing and PDF conversion are spread over `workers` processes.
+        """
+        # spawn: the caller may be a GUI process with live threads, forking it is unsafe
+        pool = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_render_worker,
+            initargs=(self.settings, self.month_no, self.year, self.tracer.enabled),
+        )
+        try:
+            futures = []
+            for payslip_details in self.prepare_payslips(self._employee_rows()):
+                payslip_info = self.unchanged_payslip(payslip_details)
+                if payslip_info is None:
+                    futures.append(pool.submit(_render_in_worker, payslip_details))
+                else:
+                    self._report_progress(payslip_info)
+
+            for future in as_completed(futures):
+                payslip_info, trace_events = future.result()
+                self.tracer.replay(trace_events)
+                self._payslip_rendered(payslip_info)
+                self._report_progress(payslip_info)
+        except BaseException:
+            pool.shutdown(wait=True, cancel_futures=True)
+            raise
+        else:
+            pool.shutdown(wait=True)
 
-        assert employee_spreadsheet_rows, "For {self.month}, no employee payroll records exist"
-        self.total += len(employee_spreadsheet_rows)
 
-        for row_num, row in enumerate(employee_spreadsheet_rows, start=2):
-            if not any([cell.value is not None for cell in row]):
-                continue
+_worker_renderer = None
+_worker_trace    = None
+
+def _init_render_worker(settings, month_no, year, tracing=False):
+    global _worker_renderer, _worker_trace
+
+    # One conversion at a time per worker process: PARALLEL_WORKERS already sets how many run at once
+    settings = dict(settings, QUICK_MODE_ENABLED=False)
+    # Worker events are buffered and handed back with each result, the main process owns the sinks
+    _worker_trace    = BufferSink() if tracing else None
+    _worker_renderer = PayslipRenderer(settings, month_no, year, tracer=Tracer(_worker_trace) if tracing else NULL_TRACER)
+    # Finalizers (unlike atexit) run when a pool worker exits
+    multiprocessing.util.Finalize(None, _worker_renderer.close, exitpriority=10)
 
-            payslip_info = self.generate_payslip(row)
-            self.counter += 1
-
-            if self.progress_callback:
-                self.progress_callback(
-                    counter=self.counter,
-                    total=self.total,
-                    name=payslip_info['details']['name']['value'],
-                    email=payslip_info['details']['email']['value'],
-                    month=self.month,
-                    payslip_filepath=payslip_info['pdf_filepath']
-                )
+def _render_in_worker(payslip_details):
+    payslip_info = _worker_renderer.render(payslip_details)
+    return payslip_info, _worker_trace.drain() if _worker_trace else []
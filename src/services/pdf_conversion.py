@@ -0,0 +1,385 @@
+"""
+XLSX -> PDF conversion backends (LibreOffice).
+
+SubprocessConverter  : one cold `soffice --headless --convert-to pdf` per document (original behaviour).
+LibreOfficeService   : starts N headless LibreOffice instances once, each listening on a local pipe,
+                       and feeds them documents over UNO. Needs the `uno` module (python3-uno).
+ConversionSupervisor : wraps either one with a per-document timeout and bounded retries (make_converter).
+ConversionQueue      : a fixed number of conversion threads behind a bounded queue (quick mode).
+"""
+
+import logging
+import os
+import shutil
+import signal
+import subprocess
+import tempfile
+import time
+from pathlib import Path
+from queue import Empty, Queue
+from threading import Event, Lock, Thread, Timer
+
+
+class ConversionError(RuntimeError):
+    """A document LibreOffice could not convert to PDF, even after retrying."""
+
+
+class SubprocessConverter:
+    """
+    Each converter runs soffice in its own user profile (created on first use, removed by close()):
+    soffice processes sharing a profile wait on its lock or fail, separate converters truly run in parallel.
+    """
+    persistent = False
+
+    def __init__(self, soffice_cmd="soffice"):
+        self.soffice_cmd = soffice_cmd
+        self.profile_dir = None
+
+    def convert(self, spreadsheet_filepath, timeout=None):
+        spreadsheet_path = Path(spreadsheet_filepath)
+        pdf_path = spreadsheet_path.with_suffix(".pdf")
+        pdf_path.unlink(missing_ok=True)
+
+        if self.profile_dir is None:
+            self.profile_dir = Path(tempfile.mkdtemp(prefix="zedulo_lo_"))
+
+        # Own process group: `soffice` is a launcher, on timeout its soffice.bin child must die too
+        process = subprocess.Popen(
+            [self.soffice_cmd, "--headless", f"-env:UserInstallation={self.profile_dir.as_uri()}",
+             "--convert-to", "pdf", "--outdir", str(spreadsheet_path.parent), str(spreadsheet_path)],
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            start_new_session=True,
+        )
+        try:
+            process.wait(timeout=timeout)
+        except subprocess.TimeoutExpired:
+            kill_process_group(process)
+            raise ConversionError(f"soffice did not finish within {timeout} s, killed")
+
+        return str(pdf_path) if pdf_path.exists() else None
+
+    def close(self):
+        if self.profile_dir is not None:
+            shutil.rmtree(self.profile_dir, ignore_errors=True)
+            self.profile_dir = None
+
+
+class _OfficeInstance:
+    """A single headless soffice process with its own profile, reachable over a named pipe."""
+
+    def __init__(self, soffice_cmd, index, startup_timeout):
+        import uno
+        from com.sun.star.connection import NoConnectException
+
+        self.profile_dir = Path(tempfile.mkdtemp(prefix=f"zedulo_lo_{index}_"))
+        self.pipe_name   = f"zedulo_{os.getpid()}_{index}"
+        self.process = subprocess.Popen(
+            [soffice_cmd, "--headless", "--invisible", "--nologo", "--norestore", "--nodefault",
+             f"-env:UserInstallation={self.profile_dir.as_uri()}",
+             f"--accept=pipe,name={self.pipe_name};urp;StarOffice.ComponentContext"],
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+
+        local_ctx = uno.getComponentContext()
+        resolver  = local_ctx.ServiceManager.createInstanceWithContext("com.sun.star.bridge.UnoUrlResolver", local_ctx)
+        deadline  = time.monotonic() + startup_timeout
+
+        while True:
+            try:
+                ctx = resolver.resolve(f"uno:pipe,name={self.pipe_name};urp;StarOffice.ComponentContext")
+                break
+            except NoConnectException:
+                if self.process.poll() is not None or time.monotonic() > deadline:
+                    self.close()
+                    raise RuntimeError(f"LibreOffice instance {index} failed to start")
+                time.sleep(0.25)
+
+        self.desktop = ctx.ServiceManager.createInstanceWithContext("com.sun.star.frame.Desktop", ctx)
+
+    @staticmethod
+    def _props(**kwargs):
+        from com.sun.star.beans import PropertyValue
+
+        props = []
+        for name, value in kwargs.items():
+            prop = PropertyValue()
+            prop.Name  = name
+            prop.Value = value
+            props.append(prop)
+        return tuple(props)
+
+    def convert(self, spreadsheet_path, pdf_path, timeout=None):
+        import uno
+
+        # A UNO call cannot be interrupted: killing the instance makes it fail, the service then replaces it
+        timed_out = Event()
+        def kill():
+            timed_out.set()
+            self.process.kill()
+
+        watchdog = Timer(timeout, kill) if timeout else None
+        if watchdog:
+            watchdog.daemon = True
+            watchdog.start()
+        try:
+            self._convert(uno, spreadsheet_path, pdf_path)
+        except Exception as e:
+            if timed_out.is_set():
+                raise ConversionError(f"LibreOffice instance did not finish within {timeout} s, killed") from e
+            raise
+        finally:
+            if watchdog:
+                watchdog.cancel()
+
+    def _convert(self, uno, spreadsheet_path, pdf_path):
+        doc = self.desktop.loadComponentFromURL(
+            uno.systemPathToFileUrl(str(spreadsheet_path)), "_blank", 0, self._props(Hidden=True)
+        )
+        try:
+            doc.storeToURL(uno.systemPathToFileUrl(str(pdf_path)), self._props(FilterName="calc_pdf_Export"))
+        finally:
+            doc.close(True)
+
+    def close(self):
+        try:
+            if self.process.poll() is None and getattr(self, "desktop", None) is not None:
+                self.desktop.terminate()
+        except Exception:
+            pass  # the bridge dies with the process, terminate() often "fails" on success
+
+        try:
+            self.process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+            self.process.wait()
+
+        shutil.rmtree(self.profile_dir, ignore_errors=True)
+
+
+class LibreOfficeService:
+    """
+    Pool of persistent headless LibreOffice instances.
+    convert() is thread-safe: each call borrows an idle instance, so at most `instances` documents convert at once.
+    An instance that dies is replaced; if the replacement cannot start, the pool shrinks by one.
+    """
+    persistent = True
+
+    def __init__(self, instances=1, soffice_cmd="soffice", startup_timeout=60):
+        self.soffice_cmd     = soffice_cmd
+        self.startup_timeout = startup_timeout
+        self.instances = []
+        self.idle      = Queue()   # only live instances
+        self.spawned   = 0
+        self.lock      = Lock()
+
+        try:
+            for _ in range(max(1, int(instances))):
+                self.idle.put(self._spawn())
+        except BaseException:
+            self.close()   # the instances already started would be orphaned
+            raise
+
+    def _spawn(self):
+        with self.lock:
+            index = self.spawned
+            self.spawned += 1
+        instance = _OfficeInstance(self.soffice_cmd, index, self.startup_timeout)
+        with self.lock:
+            self.instances.append(instance)
+        return instance
+
+    def _replace(self, dead):
+        """Starts a new instance for a dead one; raises ConversionError (the pool is one smaller) if it cannot start."""
+        try:
+            instance = self._spawn()
+        except Exception as e:
+            instance, error = None, e
+        with self.lock:
+            self.instances.remove(dead)
+            left = len(self.instances)
+        dead.close()
+        if instance is None:
+            raise ConversionError(f"Could not restart a LibreOffice instance ({left} left): {error}") from error
+        return instance
+
+    def _borrow(self):
+        while True:
+            try:
+                return self.idle.get(timeout=1)
+            except Empty:
+                # Every instance died and none could be restarted: nothing will ever be put back
+                if not self.instances:
+                    raise ConversionError("No LibreOffice instance is running")
+
+    def convert(self, spreadsheet_filepath, timeout=None):
+        spreadsheet_path = Path(spreadsheet_filepath)
+        pdf_path = spreadsheet_path.with_suffix(".pdf")
+        pdf_path.unlink(missing_ok=True)
+
+        instance = self._borrow()
+        try:
+            instance.convert(spreadsheet_path, pdf_path, timeout=timeout)
+        except Exception as e:
+            logging.error(f"LibreOffice service failed to convert {spreadsheet_path}: {e}")
+            # A dead bridge (or a killed hung instance) makes the instance useless, replace it
+            if instance.process.poll() is not None:
+                dead, instance = instance, None   # never put back, even when no replacement starts
+                instance = self._replace(dead)
+            if isinstance(e, ConversionError):
+                raise
+        finally:
+            if instance is not None:
+                self.idle.put(instance)
+
+        return str(pdf_path) if pdf_path.exists() else None
+
+    def close(self):
+        for instance in self.instances:
+            instance.close()
+        self.instances.clear()
+
+
+class ConversionSupervisor:
+    """
+    Converts with a time limit per attempt (a hung soffice is killed) and retries a failed
+    conversion `retries` times, waiting backoff, 2 x backoff, 4 x backoff... seconds in between.
+    Raises ConversionError once the attempts are used up: a bad document never blocks a run.
+    """
+    def __init__(self, converter, timeout=120, retries=2, backoff=1.0):
+        self.converter  = converter
+        self.persistent = converter.persistent
+        self.timeout    = timeout
+        self.retries    = retries
+        self.backoff    = backoff
+
+    def convert(self, spreadsheet_filepath):
+        error = None
+
+        for attempt in range(self.retries + 1):
+            if attempt:
+                delay = self.backoff * 2 ** (attempt - 1)
+                logging.warning(f"Converting {spreadsheet_filepath} failed ({error}), retrying in {delay:g} s")
+                time.sleep(delay)
+
+            try:
+                pdf_filepath = self.converter.convert(spreadsheet_filepath, timeout=self.timeout)
+            except Exception as e:
+                error = str(e) or type(e).__name__
+                continue
+
+            if pdf_filepath:
+                return pdf_filepath
+            error = "no PDF produced"
+
+        raise ConversionError(f"Could not convert {Path(spreadsheet_filepath).name} to PDF after {self.retries + 1} attempt(s): {error}")
+
+    def close(self):
+        self.converter.close()
+
+
+class ConversionQueue:
+    """
+    `workers` conversion threads fed by a bounded queue: submit() blocks while `workers` x 2 documents
+    are waiting, so quick mode never piles up threads or soffice processes. Each thread owns its own
+    converter (and so its own LibreOffice profile); the persistent service is shared, it has an instance per thread.
+    """
+    def __init__(self, settings: dict, workers=None):
+        workers = max(1, int(workers or settings.get("PDF_CONVERTER_INSTANCES", 1)))
+        self.jobs    = Queue(maxsize=workers * 2)
+        self.errors  = []
+
+        first = make_converter(settings, instances=workers)
+        self.converters = [first] if first.persistent else [first] + [make_converter(settings) for _ in range(workers - 1)]
+        self.threads = [
+            Thread(target=self._work, args=(self.converters[i % len(self.converters)],), daemon=True)
+            for i in range(workers)
+        ]
+        for thread in self.threads:
+            thread.start()
+
+    def submit(self, job):
+        """Queues job(converter), run by the next free worker thread."""
+        self.jobs.put(job)
+
+    def _work(self, converter):
+        while True:
+            job = self.jobs.get()
+            try:
+                if job is None:
+                    return
+                job(converter)
+            except Exception as e:
+                logging.error(e)
+                self.errors.append(str(e) or type(e).__name__)
+            finally:
+                self.jobs.task_done()
+
+    def drain(self):
+        """Waits until every submitted conversion is done."""
+        self.jobs.join()
+
+    def cancel(self):
+        """Drops the conversions not started yet and returns them: their documents are never converted."""
+        dropped = []
+        while True:
+            try:
+                job = self.jobs.get_nowait()
+            except Empty:
+                return dropped
+            self.jobs.task_done()
+            if job is not None:
+                dropped.append(job)
+
+    def close(self, cancel=False):
+        """Drains (or cancels) the queue, stops the threads and the converters. Returns the cancelled jobs."""
+        dropped = self.cancel() if cancel else []
+        self.drain()
+        for _ in self.threads:
+            self.jobs.put(None)
+        for thread in self.threads:
+            thread.join()
+        for converter in self.converters:
+            converter.close()
+        return dropped
+
+
+def kill_process_group(process):
+    try:
+        os.killpg(process.pid, signal.SIGKILL)
+    except ProcessLookupError:
+        pass
+    process.wait()
+
+
+def uno_available():
+    try:
+        import uno  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+def make_converter(settings: dict, instances=None):
+    """
+    Builds the converter selected by settings["PDF_CONVERTER"] ("subprocess" or "service"),
+    supervised with PDF_CONVERSION_TIMEOUT and PDF_CONVERSION_RETRIES.
+    """
+    backend = str(settings.get("PDF_CONVERTER", "subprocess")).strip().lower()
+    converter = None
+
+    if backend == "service":
+        if uno_available():
+            try:
+                converter = LibreOfficeService(instances=int(instances or settings.get("PDF_CONVERTER_INSTANCES", 1)))
+            except Exception as e:
+                logging.warning(f"The LibreOffice service could not start ({e}), falling back to 'subprocess'")
+        else:
+            logging.warning("PDF_CONVERTER is 'service' but the LibreOffice 'uno' module is missing, falling back to 'subprocess'")
+
+    return ConversionSupervisor(
+        converter or SubprocessConverter(),
+        timeout=int(settings.get("PDF_CONVERSION_TIMEOUT", 120)),
+        retries=int(settings.get("PDF_CONVERSION_RETRIES", 2)),
+    )
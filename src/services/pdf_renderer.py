@@ -0,0 +1,371 @@
+"""
+Native payslip PDF renderer: draws the payslip template straight to PDF, no xlsx file and no LibreOffice.
+
+The template layout (column widths, row heights, merged ranges, fonts, fills, borders and images)
+is read once into a PayslipLayout; every payslip then only stamps its values and writes a small PDF.
+
+Limitations compared with LibreOffice:
+    - Text uses the PDF base-14 Helvetica family whatever the template font is.
+    - Characters outside Windows-1252 are substituted ("₵" is written as "GHS ").
+    - Formulas are not evaluated; cells holding a formula render empty.
+"""
+
+import zlib
+from datetime import date, datetime
+from io import BytesIO
+from pathlib import Path
+
+from openpyxl import load_workbook
+from openpyxl.utils.cell import coordinate_to_tuple, get_column_letter
+
+from src.services.template_cache import TemplateCache
+
+PAGE_WIDTH  = 595.28   # A4 in points
+PAGE_HEIGHT = 841.89
+PAGE_MARGIN = 36
+EMU_PER_POINT = 12700
+CELL_PADDING  = 2
+
+BORDER_WIDTHS = {"hair": 0.25, "thin": 0.5, "dotted": 0.5, "dashed": 0.5, "medium": 1.0, "mediumDashed": 1.0, "double": 1.5, "thick": 1.5}
+
+FONTS = {
+    (False, False): ("F1", "Helvetica"),
+    (True,  False): ("F2", "Helvetica-Bold"),
+    (False, True) : ("F3", "Helvetica-Oblique"),
+    (True,  True) : ("F4", "Helvetica-BoldOblique"),
+}
+
+# Glyph widths (1/1000 em) of chars 32..126, from the Adobe core font metrics
+_HELVETICA_WIDTHS = [
+    278, 278, 355, 556, 556, 889, 667, 191, 333, 333, 389, 584, 278, 333, 278, 278,
+    556, 556, 556, 556, 556, 556, 556, 556, 556, 556, 278, 278, 584, 584, 584, 556,
+    1015, 667, 667, 722, 722, 667, 611, 778, 722, 278, 500, 667, 556, 833, 722, 778,
+    667, 778, 722, 667, 611, 722, 667, 944, 667, 667, 611, 278, 278, 278, 469, 556,
+    333, 556, 556, 500, 556, 556, 278, 556, 556, 222, 222, 500, 222, 833, 556, 556,
+    556, 556, 333, 500, 278, 556, 500, 722, 500, 500, 500, 334, 260, 334, 584,
+]
+_HELVETICA_BOLD_WIDTHS = [
+    278, 333, 474, 556, 556, 889, 722, 238, 333, 333, 389, 584, 278, 333, 278, 278,
+    556, 556, 556, 556, 556, 556, 556, 556, 556, 556, 333, 333, 584, 584, 584, 611,
+    975, 722, 722, 722, 722, 667, 611, 778, 722, 278, 556, 722, 611, 833, 722, 778,
+    667, 778, 722, 667, 611, 722, 667, 944, 667, 667, 611, 333, 278, 333, 584, 556,
+    333, 556, 611, 556, 611, 556, 333, 611, 611, 278, 278, 556, 278, 889, 611, 611,
+    611, 611, 389, 556, 333, 611, 556, 778, 556, 556, 500, 389, 280, 389, 584,
+]
+
+SUBSTITUTIONS = {"₵": "GHS "}
+
+
+def _pdf_text(text: str) -> bytes:
+    for char, replacement in SUBSTITUTIONS.items():
+        text = text.replace(char, replacement)
+    raw = text.encode("cp1252", errors="replace")
+    return raw.replace(b"\\", b"\\\\").replace(b"(", b"\\(").replace(b")", b"\\)")
+
+
+def _text_width(text: str, size: float, bold: bool) -> float:
+    widths = _HELVETICA_BOLD_WIDTHS if bold else _HELVETICA_WIDTHS
+    for char, replacement in SUBSTITUTIONS.items():
+        text = text.replace(char, replacement)
+    units = sum(widths[ord(c) - 32] if 32 <= ord(c) <= 126 else 556 for c in text)
+    return units * size / 1000
+
+
+def _rgb(color):
+    """openpyxl Color -> (r, g, b) floats, None for theme/indexed/auto colours."""
+    rgb = getattr(color, "rgb", None) if color is not None else None
+    if not isinstance(rgb, str) or len(rgb) not in (6, 8):
+        return None
+    rgb = rgb[-6:]
+    return tuple(int(rgb[i:i + 2], 16) / 255 for i in (0, 2, 4))
+
+
+def _display_value(value) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, str) and value.startswith("="):
+        return ""  # formula, not evaluated
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    if isinstance(value, datetime):
+        return value.strftime("%d/%m/%Y")
+    if isinstance(value, date):
+        return value.strftime("%d/%m/%Y")
+    return str(value)
+
+
+class PayslipLayout:
+    """Geometry and styling of the payslip template sheet, parsed once."""
+
+    def __init__(self, template_filepath):
+        self.template_filepath = str(template_filepath)
+        wb = load_workbook(self.template_filepath)
+        ws = wb.active
+
+        self.cells  = {}   # (row, col) -> dict of style + static value
+        self.merged = {}   # top-left (row, col) -> (min_row, min_col, max_row, max_col)
+        self.hidden = set()
+        self.images = []
+
+        for merged_range in ws.merged_cells.ranges:
+            min_col, min_row, max_col, max_row = merged_range.bounds
+            self.merged[(min_row, min_col)] = (min_row, min_col, max_row, max_col)
+            for r in range(min_row, max_row + 1):
+                for c in range(min_col, max_col + 1):
+                    if (r, c) != (min_row, min_col):
+                        self.hidden.add((r, c))
+
+        self.max_row = ws.max_row
+        self.max_col = ws.max_column
+
+        for row in ws.iter_rows():
+            for cell in row:
+                if (cell.row, cell.column) in self.hidden:
+                    continue
+                style = self._cell_style(cell)
+                if style is not None:
+                    self.cells[(cell.row, cell.column)] = style
+
+        for img in ws._images:
+            self.images.append(self._image(img))
+
+        self._init_grid(ws)
+        wb.close()
+
+    @staticmethod
+    def _cell_style(cell):
+        border = {}
+        for side in ("left", "right", "top", "bottom"):
+            edge = getattr(cell.border, side)
+            if edge is not None and edge.style:
+                border[side] = BORDER_WIDTHS.get(edge.style, 0.5)
+
+        fill = _rgb(cell.fill.fgColor) if cell.fill is not None and cell.fill.fill_type == "solid" else None
+
+        if cell.value is None and not border and fill is None:
+            return None
+
+        return {
+            "value"     : cell.value,
+            "bold"      : bool(cell.font.b),
+            "italic"    : bool(cell.font.i),
+            "size"      : float(cell.font.sz or 11),
+            "color"     : _rgb(cell.font.color),
+            "horizontal": cell.alignment.horizontal,
+            "vertical"  : cell.alignment.vertical or "bottom",
+            "border"    : border,
+            "fill"      : fill,
+        }
+
+    def _image(self, img):
+        from PIL import Image as PILImage
+
+        anchor = img.anchor
+        start  = (anchor._from.row + 1, anchor._from.col + 1, anchor._from.rowOff / EMU_PER_POINT, anchor._from.colOff / EMU_PER_POINT)
+
+        if getattr(anchor, "to", None) is not None:
+            end  = (anchor.to.row + 1, anchor.to.col + 1, anchor.to.rowOff / EMU_PER_POINT, anchor.to.colOff / EMU_PER_POINT)
+            size = None
+        elif getattr(anchor, "ext", None) is not None:
+            end  = None
+            size = (anchor.ext.cx / EMU_PER_POINT, anchor.ext.cy / EMU_PER_POINT)
+        else:
+            end  = None
+            size = (img.width * 0.75, img.height * 0.75)
+
+        picture = PILImage.open(BytesIO(img._data()))
+        if picture.mode in ("RGBA", "LA", "P"):
+            picture = picture.convert("RGBA")
+            background = PILImage.new("RGB", picture.size, (255, 255, 255))
+            background.paste(picture, mask=picture.split()[-1])
+            picture = background
+        else:
+            picture = picture.convert("RGB")
+
+        # Keep the anchor within the drawn area
+        self.max_row = max(self.max_row, (end or start)[0])
+        self.max_col = max(self.max_col, (end or start)[1])
+
+        return {
+            "start" : start,
+            "end"   : end,
+            "size"  : size,
+            "pixels": picture.size,
+            "stream": zlib.compress(picture.tobytes()),
+        }
+
+    def _init_grid(self, ws):
+        default_height = ws.sheet_format.defaultRowHeight or 15
+        default_width  = ws.sheet_format.defaultColWidth or (ws.sheet_format.baseColWidth or 8) + 0.43
+
+        # Left/top edge (points) of every column/row, one extra entry for the far edge
+        self.col_x = [0.0]
+        for col in range(1, self.max_col + 2):
+            dim = ws.column_dimensions.get(get_column_letter(col))
+            width = 0 if dim is not None and dim.hidden else (dim.width if dim is not None and dim.width else default_width)
+            self.col_x.append(self.col_x[-1] + (width * 7 + 5) * 0.75 if width else self.col_x[-1])
+
+        self.row_y = [0.0]
+        for row in range(1, self.max_row + 2):
+            dim = ws.row_dimensions.get(row)
+            height = 0 if dim is not None and dim.hidden else (dim.height if dim is not None and dim.height else default_height)
+            self.row_y.append(self.row_y[-1] + height)
+
+        sheet_width  = self.col_x[self.max_col]
+        sheet_height = self.row_y[self.max_row]
+        self.scale = min(1.0, (PAGE_WIDTH - 2 * PAGE_MARGIN) / sheet_width, (PAGE_HEIGHT - 2 * PAGE_MARGIN) / sheet_height)
+
+    def box(self, row, col, max_row=None, max_col=None):
+        """(x, y_top, width, height) in sheet points of a cell or cell range."""
+        max_row = max_row or row
+        max_col = max_col or col
+        x = self.col_x[col - 1]
+        y = self.row_y[row - 1]
+        return x, y, self.col_x[max_col] - x, self.row_y[max_row] - y
+
+
+class PdfRenderer:
+    """Renders payslip_details (the PayslipGenerator template cell dict) onto a PayslipLayout."""
+
+    def __init__(self, layout: PayslipLayout):
+        self.layout = layout
+
+    def render(self, payslip_details: dict, pdf_filepath):
+        values = {}
+        for v in payslip_details.values():
+            if v["location"]:
+                values[coordinate_to_tuple(v["location"])] = v["value"]
+
+        content = self._content(values)
+        Path(pdf_filepath).write_bytes(self._document(content))
+        return str(pdf_filepath)
+
+    def _point(self, x, y):
+        """Sheet points (origin top-left) -> PDF page points (origin bottom-left)."""
+        scale = self.layout.scale
+        return PAGE_MARGIN + x * scale, PAGE_HEIGHT - PAGE_MARGIN - y * scale
+
+    def _content(self, values):
+        layout = self.layout
+        scale  = layout.scale
+        ops    = []
+
+        keys = set(layout.cells) | {k for k in values if k not in layout.hidden}
+        for key in sorted(keys):
+            style = layout.cells.get(key) or {"value": None, "bold": False, "italic": False, "size": 11.0, "color": None,
+                                              "horizontal": None, "vertical": "bottom", "border": {}, "fill": None}
+            value = values[key] if key in values else style["value"]
+            bounds = layout.merged.get(key, (key[0], key[1], key[0], key[1]))
+            x, y, w, h = layout.box(*bounds)
+            left, top     = self._point(x, y)
+            right, bottom = self._point(x + w, y + h)
+
+            if style["fill"]:
+                ops.append(b"%.3f %.3f %.3f rg %.2f %.2f %.2f %.2f re f" % (*style["fill"], left, bottom, right - left, top - bottom))
+
+            for side, width in style["border"].items():
+                x1, y1, x2, y2 = {
+                    "left"  : (left, bottom, left, top),
+                    "right" : (right, bottom, right, top),
+                    "top"   : (left, top, right, top),
+                    "bottom": (left, bottom, right, bottom),
+                }[side]
+                ops.append(b"0 0 0 RG %.2f w %.2f %.2f m %.2f %.2f l S" % (width * scale, x1, y1, x2, y2))
+
+            text = _display_value(value)
+            if text:
+                ops.append(self._text_op(text, value, style, left, top, right, bottom))
+
+        for image_no, image in enumerate(layout.images):
+            row, col, row_off, col_off = image["start"]
+            x, y = layout.col_x[col - 1] + col_off, layout.row_y[row - 1] + row_off
+            if image["end"]:
+                end_row, end_col, end_row_off, end_col_off = image["end"]
+                w = layout.col_x[end_col - 1] + end_col_off - x
+                h = layout.row_y[end_row - 1] + end_row_off - y
+            else:
+                w, h = image["size"]
+            left, top = self._point(x, y)
+            ops.append(b"q %.2f 0 0 %.2f %.2f %.2f cm /Im%d Do Q" % (w * scale, h * scale, left, top - h * scale, image_no))
+
+        return b"\n".join(ops)
+
+    def _text_op(self, text, value, style, left, top, right, bottom):
+        size = style["size"] * self.layout.scale
+        padding = CELL_PADDING * self.layout.scale
+        width = _text_width(text, size, style["bold"])
+
+        horizontal = style["horizontal"]
+        if horizontal in (None, "general"):
+            horizontal = "right" if isinstance(value, (int, float)) and not isinstance(value, bool) else "left"
+
+        if horizontal in ("center", "centerContinuous", "distributed", "justify"):
+            tx = (left + right - width) / 2
+        elif horizontal == "right":
+            tx = right - padding - width
+        else:
+            tx = left + padding
+
+        if style["vertical"] == "top":
+            ty = top - padding - size * 0.8
+        elif style["vertical"] in ("center", "distributed", "justify"):
+            ty = (top + bottom) / 2 - size * 0.35
+        else:
+            ty = bottom + padding + size * 0.1
+
+        font_id, _ = FONTS[(style["bold"], style["italic"])]
+        color = style["color"] or (0, 0, 0)
+        return b"BT %.3f %.3f %.3f rg /%s %.2f Tf %.2f %.2f Td (%s) Tj ET" % (
+            *color, font_id.encode(), size, tx, ty, _pdf_text(text)
+        )
+
+    def _document(self, content: bytes) -> bytes:
+        objects = []
+
+        def add(body: bytes) -> int:
+            objects.append(body)
+            return len(objects)
+
+        def stream(dictionary: bytes, data: bytes) -> bytes:
+            return b"<< %s /Length %d >>\nstream\n%s\nendstream" % (dictionary, len(data), data)
+
+        font_refs = []
+        for font_id, base_font in FONTS.values():
+            ref = add(b"<< /Type /Font /Subtype /Type1 /BaseFont /%s /Encoding /WinAnsiEncoding >>" % base_font.encode())
+            font_refs.append(b"/%s %d 0 R" % (font_id.encode(), ref))
+
+        image_refs = []
+        for image_no, image in enumerate(self.layout.images):
+            width, height = image["pixels"]
+            ref = add(stream(
+                b"/Type /XObject /Subtype /Image /Width %d /Height %d /ColorSpace /DeviceRGB /BitsPerComponent 8 /Filter /FlateDecode" % (width, height),
+                image["stream"],
+            ))
+            image_refs.append(b"/Im%d %d 0 R" % (image_no, ref))
+
+        content_ref = add(stream(b"/Filter /FlateDecode", zlib.compress(content)))
+        pages_ref   = len(objects) + 2
+        page_ref    = add(
+            b"<< /Type /Page /Parent %d 0 R /MediaBox [0 0 %.2f %.2f] /Contents %d 0 R /Resources << /Font << %s >> /XObject << %s >> >> >>"
+            % (pages_ref, PAGE_WIDTH, PAGE_HEIGHT, content_ref, b" ".join(font_refs), b" ".join(image_refs))
+        )
+        add(b"<< /Type /Pages /Kids [%d 0 R] /Count 1 >>" % page_ref)
+        catalog_ref = add(b"<< /Type /Catalog /Pages %d 0 R >>" % pages_ref)
+
+        out = BytesIO()
+        out.write(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+        offsets = []
+        for number, body in enumerate(objects, start=1):
+            offsets.append(out.tell())
+            out.write(b"%d 0 obj\n%s\nendobj\n" % (number, body))
+
+        xref = out.tell()
+        out.write(b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1))
+        for offset in offsets:
+            out.write(b"%010d 00000 n \n" % offset)
+        out.write(b"trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, catalog_ref, xref))
+
+        return out.getvalue()
+
+
+payslip_layouts = TemplateCache(PayslipLayout)
@@ -0,0 +1,71 @@
+"""
+Employee rows of a month sheet cached on disk, so re-running a month does not parse the workbook again.
+
+One file per workbook and month sheet under APP_HOME_DIR/row_cache, holding row 1 and, column by column,
+only the columns the configured headers point at. An entry is used only when the workbook's path, size
+and modification time and the header settings all match, otherwise the sheet is read and the entry rewritten.
+"""
+
+import hashlib
+import logging
+import os
+import pickle
+from itertools import repeat
+from pathlib import Path
+
+from src.config import APP_HOME_DIR
+
+ROW_CACHE_DIR = Path(APP_HOME_DIR) / "row_cache"
+FORMAT_VERSION = 1   # bump when the entry layout changes
+
+
+class MonthRowCache:
+    def __init__(self, workbook_filepath, sheet_name, header_settings, cache_dir=ROW_CACHE_DIR):
+        workbook_filepath = os.path.abspath(workbook_filepath)
+        # Taken before the sheet is read: a workbook saved while it is being read invalidates the entry
+        stat = os.stat(workbook_filepath)
+
+        self.key = (FORMAT_VERSION, workbook_filepath, stat.st_size, stat.st_mtime_ns, sheet_name, tuple(header_settings))
+        name = hashlib.sha256(f"{workbook_filepath}\0{sheet_name}".encode()).hexdigest()[:32]
+        self.filepath = Path(cache_dir) / f"{name}.pickle"
+
+    def load(self):
+        """
+        Returns (header row, number of rows below it, non-empty rows) or None when there is no valid entry.
+        Rows are full-width tuples, None in the columns that were not cached.
+        """
+        try:
+            with open(self.filepath, "rb") as f:
+                entry = pickle.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logging.warning(f"Ignoring unreadable row cache {self.filepath}: {e}")
+            return None
+
+        if entry.get("key") != self.key:
+            return None
+
+        count = entry["count"]
+        columns = [entry["columns"].get(i) or repeat(None, count) for i in range(len(entry["header"]))]
+        return entry["header"], entry["total"], list(zip(*columns))
+
+    def store(self, header, total, rows, column_indexes):
+        """Caches the `column_indexes` columns of `rows` (the non-empty rows of `total` rows below `header`)."""
+        entry = {
+            "key"    : self.key,
+            "header" : list(header),
+            "total"  : total,
+            "count"  : len(rows),
+            "columns": {i: [row[i] for row in rows] for i in sorted(set(column_indexes))},
+        }
+
+        try:
+            self.filepath.parent.mkdir(parents=True, exist_ok=True)
+            # Written aside then renamed: a concurrent run never reads half an entry
+            tmp_path = self.filepath.with_name(f"{self.filepath.name}.{os.getpid()}.tmp")
+            with open(tmp_path, "wb") as f:
+                pickle.dump(entry, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, self.filepath)
+        except OSError as e:
+            logging.warning(f"Could not write the row cache {self.filepath}: {e}")
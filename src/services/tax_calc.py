@@ -1,4 +1,90 @@
-def ghana_tax_calculator(gross_income_pesewas: int, untaxed_bonus_pesewas: int, extra_deduction_pesewas: int = 0, calc_tier_2=True, rounding="nearest"):
+import json
+from bisect import bisect_right
+from functools import lru_cache
+from pathlib import Path
+
+# Year-keyed tax data: PAYE bands as (monthly band width in pesewas, rate in tenths of a percent),
+# flat rates as (numerator, denominator). "null" width = everything above.
+TAX_SCHEDULES_FILEPATH = Path(__file__).with_name("tax_schedules.json")
+
+ROUNDING_MODES = ("nearest", "truncate", "ceil")
+
+def apply_rounding(value, divisor: int, rounding: str):
+    """Apply rounding mode to (value / divisor). Works on ints and NumPy int arrays alike."""
+    if rounding == "nearest":
+        return (value + divisor // 2) // divisor
+    elif rounding == "truncate":
+        return value // divisor
+    elif rounding == "ceil":
+        return (value + divisor - 1) // divisor
+    return value // divisor
+
+
+class TaxSchedule:
+    """
+    One tax year's rates, compiled once: PAYE bands become cumulative band starts plus the
+    (rounded) tax of every full band below, per rounding mode. Income tax is then a bisect
+    for the band and one multiply for the part of it that is used.
+    """
+    def __init__(self, year: int, data: dict):
+        self.year        = year
+        self.description = data.get("description", "")
+        self.paye_bands  = [(width, rate) for width, rate in data["paye_bands"]]
+        self.employee_ssf_rate    = tuple(data["employee_ssf_rate"])
+        self.tier_2_rate          = tuple(data["tier_2_rate"])
+        self.employer_ssf_rate    = tuple(data["employer_ssf_rate"])
+        self.bonus_threshold_rate = tuple(data["bonus_threshold_rate"])
+        self.bonus_tax_rate       = tuple(data["bonus_tax_rate"])
+
+        assert self.paye_bands and self.paye_bands[-1][0] is None, f"{year} tax schedule: the last PAYE band must be open-ended (null width)"
+
+        # band_starts[i] = taxable income where band i begins
+        self.band_starts = [0]
+        for width, _ in self.paye_bands[:-1]:
+            self.band_starts.append(self.band_starts[-1] + width)
+        self.band_rates = [rate for _, rate in self.paye_bands]
+
+        # base_tax[mode][i] = tax of every full band below band i, each band rounded on its own
+        self.base_tax = {}
+        for rounding in ROUNDING_MODES:
+            base = [0]
+            for width, rate in self.paye_bands[:-1]:
+                base.append(base[-1] + apply_rounding(width * rate, 1000, rounding))
+            self.base_tax[rounding] = base
+
+    def income_tax(self, taxable_income: int, rounding: str) -> int:
+        if taxable_income <= 0:
+            return 0
+        band = bisect_right(self.band_starts, taxable_income) - 1
+        used = taxable_income - self.band_starts[band]
+        return self.base_tax[rounding][band] + apply_rounding(used * self.band_rates[band], 1000, rounding)
+
+    def __repr__(self):
+        return f"TaxSchedule({self.year}, {self.description!r})"
+
+
+@lru_cache(maxsize=None)
+def load_tax_schedules(filepath=TAX_SCHEDULES_FILEPATH) -> dict:
+    with open(filepath, "r") as f:
+        data = json.load(f)
+    return {int(year): TaxSchedule(int(year), schedule) for year, schedule in data.items()}
+
+def get_tax_schedule(year: int = None) -> TaxSchedule:
+    """
+    The schedule in force for `year`: the latest one published on or before it
+    (the earliest one for years before any data, the latest one when year is None).
+    """
+    schedules = load_tax_schedules()
+    years = sorted(schedules)
+
+    if year is None:
+        return schedules[years[-1]]
+
+    earlier = [y for y in years if y <= int(year)]
+    return schedules[earlier[-1] if earlier else years[0]]
+
+
+def ghana_tax_calculator(gross_income_pesewas: int, untaxed_bonus_pesewas: int, extra_deduction_pesewas: int = 0, calc_tier_2=True, rounding="nearest", schedule: TaxSchedule = None):
     """
     Calculates Ghana income tax (PAYE), employee_ssf, and net income on a monthly basis.
 
@@ -13,71 +99,43 @@ def ghana_tax_calculator(gross_income_pesewas: int, untaxed_bonus_pesewas: int,
             - "nearest" (default): Round to nearest pesewa (0.5 → 1)
             - "truncate": Always round down (floor)
             - "ceil": Always round up
+        schedule (TaxSchedule): Tax year to apply (default: latest, see get_tax_schedule)
 
     Returns:
         dict: All monetary values in pesewas (integers)
     """
 
     # Validate rounding mode
-    if rounding not in ("nearest", "truncate", "ceil"):
+    if rounding not in ROUNDING_MODES:
         raise ValueError(f"rounding must be 'nearest', 'truncate', or 'ceil', got '{rounding}'")
 
+    schedule = schedule or get_tax_schedule()
+
     # Handle negative values
     gross_income_pesewas = max(0, gross_income_pesewas)
     untaxed_bonus_pesewas = max(0, untaxed_bonus_pesewas)
 
-    # ---- Helper: Apply rounding based on mode ----
-    def apply_rounding(value: int, divisor: int) -> int:
-        """Apply rounding mode to (value / divisor)."""
-        if rounding == "nearest":
-            return (value + divisor // 2) // divisor
-        elif rounding == "truncate":
-            return value // divisor
-        elif rounding == "ceil":
-            return (value + divisor - 1) // divisor
-        return value // divisor
-
-    # ---- Employee SSF (5.5%) ----
-    employee_ssf = apply_rounding(gross_income_pesewas * 55, 1000)
+    # ---- Employee SSF (5.5% in 2024) ----
+    employee_ssf = apply_rounding(gross_income_pesewas * schedule.employee_ssf_rate[0], schedule.employee_ssf_rate[1], rounding)
 
     # Tier 2 pension (5%)
-    tier_2 = apply_rounding(gross_income_pesewas * 5, 100) if calc_tier_2 else 0
+    tier_2 = apply_rounding(gross_income_pesewas * schedule.tier_2_rate[0], schedule.tier_2_rate[1], rounding) if calc_tier_2 else 0
 
     # Employer SSF (13%)
-    employer_ssf = apply_rounding(gross_income_pesewas * 13, 100)
+    employer_ssf = apply_rounding(gross_income_pesewas * schedule.employer_ssf_rate[0], schedule.employer_ssf_rate[1], rounding)
 
-    # Taxable income after employee_ssf deduction
-    bonus_threshold = apply_rounding(gross_income_pesewas * 12 * 15, 100)
+    # Taxable income after employee_ssf deduction (bonus above 15% of annual basic is taxed as income)
+    bonus_threshold = apply_rounding(gross_income_pesewas * schedule.bonus_threshold_rate[0], schedule.bonus_threshold_rate[1], rounding)
     excess = untaxed_bonus_pesewas - bonus_threshold
     excess_bonus = 0 if excess < 0 else excess
 
     taxable_income = gross_income_pesewas - employee_ssf + excess_bonus
 
-    # ---- PAYE Tax Bands (Monthly - Ghana 2024) ----
-    income_tax = 0
-    remaining = taxable_income
-
-    tax_bands = [
-        (49000, 0),       # 490.00 GHS   → 0%
-        (11000, 50),      # 110.00 GHS   → 5%
-        (13000, 100),     # 130.00 GHS   → 10%
-        (316667, 175),    # 3166.67 GHS  → 17.5%
-        (1600000, 250),   # 16000.00 GHS → 25%
-        (3052000, 300),   # 30520.00 GHS → 30%
-        (None, 350),      # Above        → 35%
-    ]
-
-    for band_limit, rate in tax_bands:
-        if remaining <= 0:
-            break
-
-        taxable_amount = remaining if band_limit is None else min(remaining, band_limit)
-        band_tax = apply_rounding(taxable_amount * rate, 1000)
-        income_tax += band_tax
-        remaining -= taxable_amount
+    # ---- PAYE Tax Bands ----
+    income_tax = schedule.income_tax(taxable_income, rounding)
 
     # Bonus tax (5%)
-    bonus_tax = apply_rounding(min(untaxed_bonus_pesewas, bonus_threshold) * 5, 100)
+    bonus_tax = apply_rounding(min(untaxed_bonus_pesewas, bonus_threshold) * schedule.bonus_tax_rate[0], schedule.bonus_tax_rate[1], rounding)
     income_tax += bonus_tax
     bonus = untaxed_bonus_pesewas - bonus_tax
 
@@ -102,6 +160,109 @@ def ghana_tax_calculator(gross_income_pesewas: int, untaxed_bonus_pesewas: int,
         "net_income": net_income
     }
 
+TAX_CACHE_SIZE = 4096
+
+@lru_cache(maxsize=TAX_CACHE_SIZE)
+def _ghana_tax_calculator_cached(gross_income_pesewas, untaxed_bonus_pesewas, extra_deduction_pesewas, calc_tier_2, rounding, schedule):
+    return ghana_tax_calculator(gross_income_pesewas, untaxed_bonus_pesewas, extra_deduction_pesewas, calc_tier_2, rounding, schedule)
+
+def ghana_tax_calculator_cached(gross_income_pesewas: int, untaxed_bonus_pesewas: int, extra_deduction_pesewas: int = 0, calc_tier_2=True, rounding="nearest", schedule: TaxSchedule = None):
+    """
+    ghana_tax_calculator behind a bounded LRU cache keyed on the inputs and the tax schedule:
+    most staff share a handful of salary grades, so a payroll run repeats the same tuples.
+    Returns a fresh dict on every call, callers are free to modify it.
+    """
+    schedule = schedule or get_tax_schedule()
+    return dict(_ghana_tax_calculator_cached(
+        int(gross_income_pesewas), int(untaxed_bonus_pesewas), int(extra_deduction_pesewas),
+        bool(calc_tier_2), rounding, schedule
+    ))
+
+def tax_cache_info():
+    """Hits, misses, maxsize and currsize of the ghana_tax_calculator_cached LRU cache."""
+    return _ghana_tax_calculator_cached.cache_info()
+
+def tax_cache_clear():
+    _ghana_tax_calculator_cached.cache_clear()
+
+def ghana_tax_calculator_batch(gross_income_pesewas, untaxed_bonus_pesewas, extra_deduction_pesewas=None, calc_tier_2=True, rounding="nearest", schedule: TaxSchedule = None):
+    """
+    Vectorised ghana_tax_calculator over whole payroll arrays (what-if scenarios, tens of thousands of rows).
+
+    Same rules, same rounding modes and pesewa-identical results as the scalar function,
+    computed with NumPy int64 arithmetic. NumPy is an optional dependency, only needed here.
+
+    Args:
+        gross_income_pesewas (array-like of int): Gross salaries in pesewas
+        untaxed_bonus_pesewas (array-like of int): Bonuses in pesewas
+        extra_deduction_pesewas (array-like of int): Extra deductions in pesewas (default: zeros)
+        calc_tier_2 (bool): Whether to calculate Tier 2 pension contribution
+        rounding (str): "nearest", "truncate" or "ceil" (see ghana_tax_calculator)
+        schedule (TaxSchedule): Tax year to apply (default: latest, see get_tax_schedule)
+
+    Returns:
+        dict: Same keys as ghana_tax_calculator, each an int64 array
+    """
+    try:
+        import numpy as np
+    except ImportError as e:
+        raise ImportError("ghana_tax_calculator_batch needs NumPy: pip install numpy") from e
+
+    if rounding not in ROUNDING_MODES:
+        raise ValueError(f"rounding must be 'nearest', 'truncate', or 'ceil', got '{rounding}'")
+
+    schedule = schedule or get_tax_schedule()
+
+    gross = np.maximum(np.asarray(gross_income_pesewas, dtype=np.int64), 0)
+    bonus = np.maximum(np.asarray(untaxed_bonus_pesewas, dtype=np.int64), 0)
+    gross, bonus = np.broadcast_arrays(gross, bonus)
+    extra = (np.zeros_like(gross) if extra_deduction_pesewas is None
+             else np.broadcast_to(np.asarray(extra_deduction_pesewas, dtype=np.int64), gross.shape))
+
+    # numpy's // floors like Python's, so apply_rounding gives identical results on arrays
+    def rate(value, fraction):
+        return apply_rounding(value * fraction[0], fraction[1], rounding)
+
+    employee_ssf = rate(gross, schedule.employee_ssf_rate)
+    tier_2 = rate(gross, schedule.tier_2_rate) if calc_tier_2 else np.zeros_like(gross)
+    employer_ssf = rate(gross, schedule.employer_ssf_rate)
+
+    bonus_threshold = rate(gross, schedule.bonus_threshold_rate)
+    excess_bonus = np.maximum(bonus - bonus_threshold, 0)
+    taxable_income = gross - employee_ssf + excess_bonus
+
+    # Same compiled bands as TaxSchedule.income_tax: searchsorted is the vectorised bisect
+    band_starts = np.asarray(schedule.band_starts, dtype=np.int64)
+    band = np.searchsorted(band_starts, taxable_income, side="right") - 1
+    band = np.maximum(band, 0)
+    used = taxable_income - band_starts[band]
+    income_tax = (np.asarray(schedule.base_tax[rounding], dtype=np.int64)[band]
+                  + apply_rounding(used * np.asarray(schedule.band_rates, dtype=np.int64)[band], 1000, rounding))
+    income_tax = np.where(taxable_income > 0, income_tax, 0)
+
+    bonus_tax = rate(np.minimum(bonus, bonus_threshold), schedule.bonus_tax_rate)
+    income_tax = income_tax + bonus_tax
+
+    total_deductions = employee_ssf + income_tax
+    total_contributions = tier_2 + employer_ssf
+    total_income = gross + bonus
+    net_income = total_income - total_deductions - extra
+
+    return {
+        "gross_income": gross,
+        "employee_ssf": employee_ssf,
+        "tier_2": tier_2,
+        "employer_ssf": employer_ssf,
+        "untaxed_bonus": bonus,
+        "bonus_tax": bonus_tax,
+        "income_tax": income_tax,
+        "total_deductions": total_deductions,
+        "total_contributions": total_contributions,
+        "extra_deduction": np.array(extra),
+        "total_income": total_income,
+        "net_income": net_income
+    }
+
 # --------------------------
 # Helper Functions for Conversion
 # --------------------------
@@ -167,5 +328,5 @@ if __name__ == "__main__":
 
 
     print("\n" + "=" * 80)
-    print("✅ GRA Act 896 compliant. Zero imports. Drop-in ready.")
+    print("✅ GRA Act 896 compliant. Drop-in ready.")
     print("=" * 80)
@@ -0,0 +1,68 @@
+"""
+Parsed payslip templates cached per file, reloaded when the template file changes (mtime/size),
+so a run parses PAYSLIP_TEMPLATE_FILEPATH once and a new template picked in Settings is still honoured.
+"""
+
+import os
+from io import BytesIO
+from threading import Lock
+
+from openpyxl import load_workbook
+from openpyxl.drawing.image import Image
+
+
+class TemplateCache:
+    def __init__(self, loader):
+        self.loader  = loader
+        self.entries = {}  # path -> (mtime_ns, size, parsed template)
+        self.lock    = Lock()
+
+    def get(self, filepath):
+        filepath = os.path.abspath(filepath)
+        stat = os.stat(filepath)
+        key  = (stat.st_mtime_ns, stat.st_size)
+
+        with self.lock:
+            entry = self.entries.get(filepath)
+            if entry is None or entry[:2] != key:
+                entry = (*key, self.loader(filepath))
+                self.entries[filepath] = entry
+            return entry[2]
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+class PayslipTemplate:
+    """
+    The template workbook kept in memory. Every payslip stamps the same set of cells,
+    so one workbook is re-stamped and saved to bytes instead of copied and re-parsed per employee.
+    """
+    def __init__(self, template_filepath):
+        self.wb = load_workbook(template_filepath)
+        self.ws = self.wb.active
+        self.lock = Lock()
+
+        # Openpyxl drops images on save unless re-added, and an Image can only be saved once,
+        # so keep the raw bytes and anchors and rebuild fresh Images for every save
+        self.images = [(img._data(), img.anchor) for img in self.ws._images]
+
+    def render(self, payslip_details: dict) -> bytes:
+        with self.lock:
+            self.ws._images = []
+            for data, anchor in self.images:
+                img = Image(BytesIO(data))
+                img.anchor = anchor
+                self.ws._images.append(img)
+
+            for v in payslip_details.values():
+                if v['location']:
+                    self.ws[v['location']] = v['value']
+
+            out = BytesIO()
+            self.wb.save(out)
+            return out.getvalue()
+
+
+payslip_templates = TemplateCache(PayslipTemplate)
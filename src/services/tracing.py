@@ -0,0 +1,186 @@
+"""
+Structured timing events for payroll runs: spans around the stages of PayslipGenerator and YTD_Tracker
+(sheet load and parse, tax, YTD database, payslip format, fingerprint, xlsx write, PDF conversion)
+with the employee's staff number and duration.
+
+Events go to pluggable sinks: a JSONL trace file and/or per-stage histograms (p50/p95/max).
+Tracing is off by default (TRACING_ENABLED), NULL_TRACER's spans then do nothing.
+"""
+
+import json
+import logging
+import os
+import time
+from threading import Lock
+
+
+class _Span:
+    __slots__ = ("tracer", "stage", "fields", "start")
+
+    def __init__(self, tracer, stage, fields):
+        self.tracer = tracer
+        self.stage  = stage
+        self.fields = fields
+        self.start  = None
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        self.tracer.emit({"event": "start", "stage": self.stage, "ts": time.time(), **self.fields})
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        event = {
+            "event"     : "end",
+            "stage"     : self.stage,
+            "ts"        : time.time(),
+            "duration_s": time.perf_counter() - self.start,
+            **self.fields
+        }
+        if exc_type is not None:
+            event["error"] = exc_type.__name__
+        self.tracer.emit(event)
+        return False
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+class NullTracer:
+    """Tracing off: one shared do-nothing span, no clock reads, no allocations per event."""
+    enabled = False
+    _span   = _NullSpan()
+
+    def span(self, stage, **fields):
+        return self._span
+
+    def emit(self, event):
+        pass
+
+    def replay(self, events):
+        pass
+
+    def summary(self):
+        return {}
+
+    def close(self):
+        pass
+
+
+NULL_TRACER = NullTracer()
+
+
+class Tracer:
+    enabled = True
+
+    def __init__(self, *sinks):
+        self.sinks = list(sinks)
+        self.lock  = Lock()  # quick-mode conversions emit from background threads
+
+    def span(self, stage, **fields):
+        """Context manager timing one stage: `with tracer.span("xlsx", staff_number=12): ...`"""
+        return _Span(self, stage, fields)
+
+    def emit(self, event):
+        with self.lock:
+            for sink in self.sinks:
+                sink.write(event)
+
+    def replay(self, events):
+        """Re-emits events recorded elsewhere (worker processes) in this tracer's sinks."""
+        for event in events:
+            self.emit(event)
+
+    def summary(self):
+        """Per-stage statistics of the sinks that aggregate (HistogramSink)."""
+        summary = {}
+        for sink in self.sinks:
+            if hasattr(sink, "summary"):
+                summary.update(sink.summary())
+        return summary
+
+    def close(self):
+        for sink in self.sinks:
+            sink.close()
+
+
+class JsonlSink:
+    """One JSON object per line, appended to `filepath`."""
+    def __init__(self, filepath):
+        filepath = os.path.expanduser(filepath)
+        os.makedirs(os.path.dirname(os.path.abspath(filepath)), exist_ok=True)
+        self.file = open(filepath, "a", buffering=1 << 16)
+
+    def write(self, event):
+        self.file.write(json.dumps(event, default=str) + "\n")
+
+    def close(self):
+        self.file.close()
+
+
+class HistogramSink:
+    """Keeps the durations of finished spans per stage, summarised as count/total/p50/p95/max seconds."""
+    def __init__(self):
+        self.durations = {}
+
+    def write(self, event):
+        if event["event"] == "end":
+            self.durations.setdefault(event["stage"], []).append(event["duration_s"])
+
+    def summary(self):
+        summary = {}
+        for stage, durations in self.durations.items():
+            durations = sorted(durations)
+            summary[stage] = {
+                "count"  : len(durations),
+                "total_s": round(sum(durations), 6),
+                "p50_s"  : round(percentile(durations, 50), 6),
+                "p95_s"  : round(percentile(durations, 95), 6),
+                "max_s"  : round(durations[-1], 6),
+            }
+        return summary
+
+    def close(self):
+        pass
+
+
+class BufferSink:
+    """Collects events in memory, for handing them over to another process's tracer."""
+    def __init__(self):
+        self.events = []
+
+    def write(self, event):
+        self.events.append(event)
+
+    def drain(self):
+        events, self.events = self.events, []
+        return events
+
+    def close(self):
+        self.events = []
+
+
+def percentile(sorted_values, percent):
+    """Nearest-rank percentile of an already sorted, non-empty list."""
+    rank = max(1, -(-len(sorted_values) * percent // 100))
+    return sorted_values[int(rank) - 1]
+
+
+def make_tracer(settings: dict):
+    if not settings.get("TRACING_ENABLED"):
+        return NULL_TRACER
+
+    sinks = [HistogramSink()]
+    if settings.get("TRACE_LOG_PATH"):
+        try:
+            sinks.append(JsonlSink(settings["TRACE_LOG_PATH"]))
+        except OSError as e:
+            logging.warning(f"Cannot write the trace file {settings['TRACE_LOG_PATH']}: {e}")
+
+    return Tracer(*sinks)
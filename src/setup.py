@@ -1,9 +1,30 @@
-import os, json, subprocess, shutil, venv
+import os, json, subprocess, shutil, venv, importlib.util
 from pathlib import Path
 from config import APP_HOME_DIR, APP_CONFIG_FILEPATH, APP_CONFIG, APP_NAME
 import sys
 from conn_utils import is_online
 
+def expose_uno(venv_path):
+    """
+    Makes LibreOffice's python3-uno (a system package) importable in the venv without the rest of the
+    system packages: uno.py, unohelper.py and the pyuno module are linked into venv/uno, the only
+    directory a .pth file adds (after the venv's own packages).
+    """
+    spec = importlib.util.find_spec("uno")
+    if spec is None or spec.origin is None:
+        print("⚠️ python3-uno not found: PDF_CONVERTER 'service' will fall back to 'subprocess'")
+        return
+
+    system_dir = Path(spec.origin).parent
+    uno_dir = venv_path / "uno"
+    uno_dir.mkdir(exist_ok=True)
+    for source in [system_dir / "uno.py", system_dir / "unohelper.py", *system_dir.glob("pyuno*.so")]:
+        if source.exists():
+            (uno_dir / source.name).symlink_to(source)
+
+    site_packages = next((venv_path / "lib").glob("python3*/site-packages"))
+    (site_packages / "libreoffice_uno.pth").write_text(str(uno_dir) + "\n")
+
 def setup(fresh):
     Path(APP_HOME_DIR).mkdir(exist_ok=True)
 
@@ -17,9 +38,10 @@ def setup(fresh):
         ignore=shutil.ignore_patterns('__pycache__', '*.pyc', 'bin', 'build', 'dist', '.git', 'venv')
     )
 
-    # Create venv with pip
+    # Create venv with pip, LibreOffice's python3-uno is the only system package it sees
     venv_path = app_dest / "venv"
     venv.create(str(venv_path), with_pip=True)
+    expose_uno(venv_path)
 
     # Install dependencies
     requirements = app_dest / "requirements.txt"
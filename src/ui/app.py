@@ -1,14 +1,16 @@
 import tkinter as tk
-from tkinter import messagebox, filedialog
+from tkinter import ttk, messagebox, filedialog
 from threading import Thread, Event
 from pathlib import Path
-from src.config_manager import ConfigManager
+from src.config_manager import ConfigManager, ConfigError
 from src.ui.settings_window import SettingsWindow
+from src.ui.progress_channel import ProgressChannel
 from src.services.file_explorer import open_with_default_app
-from src.services.payslip_generator import PayslipGenerator
-from openpyxl import load_workbook
 from datetime import datetime
-from src.services.mailing import send_payslip_email, send_bulk_payslips
+import logging
+
+# Generation, mailing and bundling (openpyxl, SQLite, email) are imported by the methods that use them:
+# the window shows without loading them, see benchmarks/bench_startup.py
 
 class App:
     def __init__(self, root):
@@ -17,14 +19,15 @@ class App:
         self.root.geometry("1000x900")
 
         self.config_manager = ConfigManager()
-        self.config = self.config_manager.load()
+        self.config = self.config_manager.load(validate=False)  # invalid settings are reported when used, Settings must still open
 
         self.generated_payslips = {}
-        self.payslip_widgets = {}
 
         # Month selection: Dict of StringVars keyed by month name
         self.month_vars = {}
         self._build_ui()
+        # Workers never touch Tk or generated_payslips: they post here, the UI applies it 10 times a second
+        self.progress = ProgressChannel(self.root, on_items=self._add_payslip_entries, on_status=lambda text: self.progress_label.config(text=text))
         self.settings_window = None
         self.batch_mailing_inprog = False
         self.mailing_stop_event = Event()
@@ -133,55 +136,93 @@ class App:
         self.send_all_btn = tk.Button(button_frame, text="Send All Emails", width=20, command=self._send_all_emails, state="disabled")
         self.send_all_btn.grid(row=0, column=2, padx=10)
 
+        self.bundle_btn = tk.Button(button_frame, text="Bundle Months", width=20, command=self._start_bundling)
+        self.bundle_btn.grid(row=0, column=3, padx=10)
+
         # Progress label
         self.progress_label = tk.Label(main_frame, text="_", font=("Helvetica", 12))
         self.progress_label.grid(row=5, column=0, pady=(0, 20))
 
-        # Scrollable payslip list section
+        # Payslip list: a Treeview only draws the visible rows, so full-year runs of thousands stay light
         list_frame = tk.LabelFrame(self.root, text="Generated Payslips", padx=10, pady=10)
         list_frame.grid(row=1, column=0, sticky="nsew", padx=40, pady=(0, 40))
         list_frame.columnconfigure(0, weight=1)
-        list_frame.rowconfigure(0, weight=1)
-
-        self.payslip_canvas = tk.Canvas(list_frame, highlightthickness=0)
-        self.payslip_scrollbar = tk.Scrollbar(list_frame, orient="vertical", command=self.payslip_canvas.yview)
-        self.payslip_scrollable_frame = tk.Frame(self.payslip_canvas)
-
-        self.payslip_scrollable_frame.bind(
-            "<Configure>",
-            lambda e: self.payslip_canvas.configure(scrollregion=self.payslip_canvas.bbox("all"))
-        )
-        self.payslip_canvas.bind(
-            "<Configure>",
-            lambda e: self.payslip_canvas.itemconfig(self.canvas_window, width=e.width)
-        )
-
-        self.canvas_window = self.payslip_canvas.create_window((0, 0), window=self.payslip_scrollable_frame, anchor="nw", tags="scrollable_frame")
-        self.payslip_canvas.configure(yscrollcommand=self.payslip_scrollbar.set)
-
-        self.payslip_canvas.pack(side="left", fill="both", expand=True)
-        self.payslip_scrollbar.pack(side="right", fill="y")
-
-        self.payslip_canvas.bind("<Enter>", self._bind_payslip_mousewheel)
-        self.payslip_canvas.bind("<Leave>", self._unbind_payslip_mousewheel)
-
-        self.payslip_row = 0
-
-    def _bind_payslip_mousewheel(self, event):
-        self.payslip_canvas.bind_all("<MouseWheel>", self._on_payslip_mousewheel)
-        self.payslip_canvas.bind_all("<Button-4>", self._on_payslip_mousewheel)
-        self.payslip_canvas.bind_all("<Button-5>", self._on_payslip_mousewheel)
-
-    def _unbind_payslip_mousewheel(self, event):
-        self.payslip_canvas.unbind_all("<MouseWheel>")
-        self.payslip_canvas.unbind_all("<Button-4>")
-        self.payslip_canvas.unbind_all("<Button-5>")
-
-    def _on_payslip_mousewheel(self, event):
-        if event.num == 5 or event.delta == -120:
-            self.payslip_canvas.yview_scroll(1, "units")
-        elif event.num == 4 or event.delta == 120:
-            self.payslip_canvas.yview_scroll(-1, "units")
+        list_frame.rowconfigure(1, weight=1)
+
+        toolbar = tk.Frame(list_frame)
+        toolbar.grid(row=0, column=0, columnspan=2, sticky="w", pady=(0, 5))
+
+        self.review_btn = tk.Button(toolbar, text="Review PDF", width=10, command=self._review_selected, state="disabled")
+        self.review_btn.pack(side="left", padx=2)
+        self.open_folder_btn = tk.Button(toolbar, text="Open Folder", width=10, command=self._open_selected_folder, state="disabled")
+        self.open_folder_btn.pack(side="left", padx=2)
+        self.send_email_btn = tk.Button(toolbar, text="Send Email", width=10, command=self._send_selected_email, state="disabled")
+        self.send_email_btn.pack(side="left", padx=2)
+
+        self.payslip_tree = ttk.Treeview(list_frame, columns=("name", "period", "file", "email"), show="headings", selectmode="browse")
+        for column, heading, width, stretch in [
+            ("name"  , "Name"  , 220, True),
+            ("period", "Period", 120, False),
+            ("file"  , "File"  , 300, True),
+            ("email" , "Email" , 220, True),
+        ]:
+            self.payslip_tree.heading(column, text=heading)
+            self.payslip_tree.column(column, width=width, stretch=stretch, anchor="w")
+
+        self.payslip_scrollbar = ttk.Scrollbar(list_frame, orient="vertical", command=self.payslip_tree.yview)
+        self.payslip_tree.configure(yscrollcommand=self.payslip_scrollbar.set)
+        self.payslip_tree.grid(row=1, column=0, sticky="nsew")
+        self.payslip_scrollbar.grid(row=1, column=1, sticky="ns")
+
+        self.payslip_menu = tk.Menu(self.root, tearoff=0)
+        self.payslip_menu.add_command(label="Review PDF", command=self._review_selected)
+        self.payslip_menu.add_command(label="Open Folder", command=self._open_selected_folder)
+        self.payslip_menu.add_command(label="Send Email", command=self._send_selected_email)
+
+        self.payslip_tree.bind("<<TreeviewSelect>>", self._on_payslip_select)
+        self.payslip_tree.bind("<Double-1>", lambda e: self._review_selected())
+        self.payslip_tree.bind("<Return>", lambda e: self._review_selected())
+        self.payslip_tree.bind("<Button-3>", self._show_payslip_menu)
+
+    def _selected_payslip(self):
+        """Path (row id) of the selected payslip, or None."""
+        selection = self.payslip_tree.selection()
+        return selection[0] if selection else None
+
+    def _on_payslip_select(self, event=None):
+        path = self._selected_payslip()
+        state = "normal" if path else "disabled"
+        self.review_btn.config(state=state)
+        self.open_folder_btn.config(state=state)
+
+        has_email = bool(path and self.generated_payslips.get(path, {}).get("email", "").strip())
+        self.send_email_btn.config(state="normal" if has_email else "disabled")
+        self.payslip_menu.entryconfig("Send Email", state="normal" if has_email else "disabled")
+
+    def _show_payslip_menu(self, event):
+        path = self.payslip_tree.identify_row(event.y)
+        if not path:
+            return
+        self.payslip_tree.selection_set(path)
+        self.payslip_tree.focus(path)
+        self._on_payslip_select()
+        self.payslip_menu.tk_popup(event.x_root, event.y_root)
+
+    def _review_selected(self):
+        path = self._selected_payslip()
+        if path:
+            self._review_payslip(path)
+
+    def _open_selected_folder(self):
+        path = self._selected_payslip()
+        if path:
+            self._open_folder(path)
+
+    def _send_selected_email(self):
+        path = self._selected_payslip()
+        payslip = self.generated_payslips.get(path)
+        if payslip and payslip["email"].strip():
+            self._send_payslip_email(path, payslip["email"], payslip["name"], payslip["month"])
 
     def _select_all_months(self):
         for var in self.month_vars.values():
@@ -215,32 +256,41 @@ class App:
             messagebox.showerror("Error", "Please select at least one month!", parent=self.root)
             return
 
-        self.config = self.config_manager.load()
+        try:
+            self.config = self.config_manager.load()
+        except ConfigError as e:
+            messagebox.showerror("Invalid Settings", str(e), parent=self.root)
+            return
 
         if not self.config.get("EMPLOYEE_SPREADSHEET_FILEPATH"):
             messagebox.showerror("Error", "Employee spreadsheet not configured!", parent=self.root)
             return
+
+        from src.services.employee_workbook import EmployeeWorkbook
+        from src.services.template_cache import payslip_templates
         try:
-            load_workbook(self.config["EMPLOYEE_SPREADSHEET_FILEPATH"])
+            # Checked here (missing or not an .xlsx), opened on first read and shared by every month's generator
+            employee_workbook = EmployeeWorkbook(self.config["EMPLOYEE_SPREADSHEET_FILEPATH"])
         except Exception as e:
             messagebox.showerror("Error", f"Could not open spreadsheet:\n{str(e)}", parent=self.root)
             return
 
         if not self.config.get("PAYSLIP_TEMPLATE_FILEPATH"):
+            employee_workbook.close()
             messagebox.showerror("Error", "Payslip template not configured!", parent=self.root)
             return
         try:
-            load_workbook(self.config["PAYSLIP_TEMPLATE_FILEPATH"])
+            # Parses through the shared cache, so the generators reuse this parse
+            payslip_templates.get(self.config["PAYSLIP_TEMPLATE_FILEPATH"])
         except Exception as e:
+            employee_workbook.close()
             messagebox.showerror("Error", f"Could not open spreadsheet:\n{str(e)}", parent=self.root)
             return
 
         # Reset Dict and UI
         self.generated_payslips.clear()
-        self.payslip_widgets.clear()
-        for widget in self.payslip_scrollable_frame.winfo_children():
-            widget.destroy()
-        self.payslip_row = 0
+        self.payslip_tree.delete(*self.payslip_tree.get_children())
+        self._on_payslip_select()
 
         self.generate_btn.config(state="disabled")
 
@@ -250,32 +300,91 @@ class App:
         self.progress_label.config(text=f"Starting generation for {months_display} ({selected_year})...")
 
         # Pass INTEGERS to backend
-        Thread(target=self._generate_worker, args=(selected_months, selected_year), daemon=True).start()
+        Thread(target=self._generate_worker, args=(selected_months, selected_year, employee_workbook), daemon=True).start()
+
+    def _start_bundling(self):
+        selected_year   = int(self.year_var.get())
+        selected_months = self._get_selected_months()
+        if not selected_months:
+            messagebox.showerror("Error", "Please select at least one month!", parent=self.root)
+            return
+
+        try:
+            self.config = self.config_manager.load()
+        except ConfigError as e:
+            messagebox.showerror("Invalid Settings", str(e), parent=self.root)
+            return
+
+        from src.services.month_bundle import pypdf_available
+
+        # Without pypdf the zip archives can still be made
+        merge_pdf = pypdf_available()
+        if not merge_pdf and not messagebox.askyesno(
+            "Bundle Months", "pypdf is not installed (pip install pypdf), so no merged PDF can be made.\n\nCreate the zip archives only?", parent=self.root
+        ):
+            return
+
+        self.bundle_btn.config(state="disabled")
+        self.progress_label.config(text=f"Bundling payslips of {len(selected_months)} month(s) ({selected_year})...")
+        Thread(target=self._bundle_worker, args=(selected_months, selected_year, merge_pdf), daemon=True).start()
+
+    def _bundle_worker(self, selected_months, selected_year, merge_pdf):
+        from src.services.month_bundle import bundle_month
 
-    def _generate_worker(self, selected_months, selected_year):
+        bundles, errors = [], []
+
+        for month in selected_months:
+            month_name = self._get_month_name(month)
+            try:
+                bundles += bundle_month(
+                    self.config, month, selected_year, pdf=merge_pdf, zip=True,
+                    progress_callback=lambda c, t: self.progress.status(f"Bundled {c} / {t} {month_name} payslips")
+                )
+            except Exception as e:
+                logging.error(e, exc_info=True)
+                errors.append(f"{month_name}: {e}")
+
+        self.progress.call(self._bundling_complete, bundles, errors)
+
+    def _bundling_complete(self, bundles, errors):
+        self.bundle_btn.config(state="normal")
+        self.progress_label.config(text=f"{len(bundles)} bundle file(s) created")
+
+        message = "\n".join(Path(path).name for path in bundles) or "No bundle created."
+        if errors:
+            message += "\n\nFailed:\n" + "\n".join(errors)
+            messagebox.showwarning("Bundle Months", message, parent=self.root)
+        elif bundles:
+            messagebox.showinfo("Bundle Months", f"Created in {Path(bundles[0]).parent}:\n\n{message}", parent=self.root)
+        else:
+            messagebox.showinfo("Bundle Months", message, parent=self.root)
+
+    def _generate_worker(self, selected_months, selected_year, employee_workbook):
         try:
+            from src.services.payslip_generator import PayslipGenerator
+
             def progress_callback(counter, total, name=None, email=None, month=None, payslip_filepath=None):
                 if payslip_filepath:
-                    self.generated_payslips[payslip_filepath] = {
+                    self.progress.item({
                         "name": name or "Unknown",
                         "email": email or "",
                         "month": month or "",
+                        "year": selected_year,
                         "payslip_filepath": payslip_filepath
-                    }
-                    # Pass email to _add_payslip_entry
-                    self.root.after(0, lambda m=month, y=selected_year, p=payslip_filepath, n=name, e=email: self._add_payslip_entry(m, y, p, n, e))
-                self.root.after(0, lambda: self.progress_label.config(text=f"Generated {counter} / {total} {month} payslips"))
+                    })
+                self.progress.status(f"Generated {counter} / {total} {month} payslips")
 
             for month in selected_months:
-                generator = PayslipGenerator(month_no=month, year=selected_year, progress_callback=progress_callback, config=self.config)
+                generator = PayslipGenerator(month_no=month, year=selected_year, progress_callback=progress_callback, config=self.config, employee_workbook=employee_workbook)
                 generator.generate_payslips()
 
-            self.root.after(0, lambda: self._generation_complete(selected_months, selected_year))
+            self.progress.call(self._generation_complete, selected_months, selected_year)
         except Exception as e:
-            import logging
             logging.error(e, exc_info=True)
-            self.root.after(0, lambda: messagebox.showerror("Error", str(e), parent=self.root))
-            self.root.after(0, lambda: self.generate_btn.config(state="normal"))
+            self.progress.call(messagebox.showerror, "Error", str(e), parent=self.root)
+            self.progress.call(self.generate_btn.config, state="normal")
+        finally:
+            employee_workbook.close()
 
     def _generation_complete(self, selected_months, selected_year):
         count = len(self.generated_payslips)
@@ -290,47 +399,21 @@ class App:
 
         messagebox.showinfo("Success", f"All payslips have been generated successfully for {months_display} ({selected_year}).\n\nTotal: {count}", parent=self.root)
 
-    def _add_payslip_entry(self, month, year, path, name, email=None):
-        if path in self.payslip_widgets:
-            return
-
-        frame = tk.Frame(self.payslip_scrollable_frame, pady=5, padx=5)
-        frame.grid(row=self.payslip_row, column=0, sticky="ew", pady=2)
-        frame.columnconfigure(0, weight=1)  # Label expands
-
-        info_frame = tk.Frame(frame)
-        info_frame.grid(row=0, column=0, sticky="w", padx=(0, 10))
-
-        display_text = f"{name}"
-        if month:
-            display_text += f" ({month} {year})"
-
-        label = tk.Label(info_frame, text=display_text, font=("Helvetica", 10, "bold"), anchor="w", wraplength=400)
-        label.pack(anchor="w")
-
-        path_label = tk.Label(info_frame, text=Path(path).name, font=("Helvetica", 8), fg="gray", anchor="w", wraplength=400)
-        path_label.pack(anchor="w")
-
-        btn_frame = tk.Frame(frame)
-        btn_frame.grid(row=0, column=1, sticky="e")
-
-        review_btn = tk.Button(btn_frame, text="Review PDF", width=10, command=lambda p=path: self._review_payslip(p))
-        review_btn.pack(side="left", padx=2)
-
-        open_folder_btn = tk.Button(btn_frame, text="Open Folder", width=10, command=lambda p=path: self._open_folder(p))
-        open_folder_btn.pack(side="left", padx=2)
-
-        email_btn = tk.Button(btn_frame, text="Send Email", width=10)
-        email_btn.config(command=lambda p=path, e=email, n=name, m=month, b=email_btn: self._send_payslip_email(p, e, n, m, b))
-        email_btn.pack(side="left", padx=2)
-
-        if not email or not email.strip():
-            email_btn.config(state="disabled", text="No Email")
-
-        self.payslip_widgets[path] = frame
-        self.payslip_row += 1
-
-        self.root.after(10, lambda: self.payslip_canvas.configure(scrollregion=self.payslip_canvas.bbox("all")))
+    def _add_payslip_entries(self, payslips):
+        """Records and lists a batch of generated payslips (Tk thread)."""
+        for payslip in payslips:
+            path = payslip["payslip_filepath"]
+            self.generated_payslips[path] = payslip
+            if self.payslip_tree.exists(path):
+                continue
+
+            email = payslip["email"]
+            self.payslip_tree.insert("", "end", iid=path, values=(
+                payslip["name"],
+                f"{payslip['month']} {payslip['year']}" if payslip["month"] else "",
+                Path(path).name,
+                email if email.strip() else "No Email"
+            ))
 
     def _review_payslip(self, path):
         if Path(path).exists():
@@ -345,60 +428,48 @@ class App:
         else:
             messagebox.showerror("Error", f"Folder not found: {folder}", parent=self.root)
 
-    def _send_payslip_email(self, pdf_path, recipient_email, employee_name, month, btn_widget):
-        """Non-blocking single email send. Disables button during operation."""
+    def _send_payslip_email(self, pdf_path, recipient_email, employee_name, month):
+        """Non-blocking single email send. The row shows the progress, the toolbar button is disabled meanwhile."""
 
         def _worker():
             try:
+                from src.services.mailing import send_payslip_email
                 success, message = send_payslip_email(recipient_email, employee_name, month, pdf_path)
-                # Schedule UI update on main thread
-                self.root.after(0, lambda: _finish(success, message))
+                self.progress.call(_finish, success, message)
             except Exception as e:
-                self.root.after(0, lambda: _finish(False, str(e)))
+                self.progress.call(_finish, False, str(e))
 
         def _finish(success, message):
-            btn_widget.config(state="normal", text="Resend Email")  # Re-enable button
+            if self.payslip_tree.exists(pdf_path):
+                self.payslip_tree.set(pdf_path, "email", f"{recipient_email} ({'✓' if success else 'failed'})")
+            self._on_payslip_select()
             if success:
                 messagebox.showinfo("Email Ready", message, parent=self.root)
             else:
                 messagebox.showerror("Email Failed", message, parent=self.root)
 
-        btn_widget.config(state="disabled", text="Sending...")
+        self.payslip_tree.set(pdf_path, "email", f"{recipient_email} (sending...)")
+        self.send_email_btn.config(state="disabled")
         Thread(target=_worker, daemon=True).start()
 
     def _send_all_emails(self):
         """Toggle start/stop for batch emailing."""
 
         # --- Nested Helper: Worker ---
-        def _worker(payslip_list, stop_event):
-            success, failed, errors = 0, 0, []
+        def _worker(payslip_list, stop_event, sender):
+            results = {"success": 0, "failed": 0, "errors": []}
             try:
-                for i, item in enumerate(payslip_list):
-                    if stop_event.is_set():
-                        break  # ← Cancel requested
-
-                    try:
-                        ok, msg = send_payslip_email(
-                            recipient_email=item["email"],
-                            employee_name=item["name"],
-                            month=item["month"],
-                            pdf_path=item["pdf"]
-                        )
-                        if ok:
-                            success += 1
-                        else:
-                            failed += 1
-                            errors.append({"email": item["email"], "error": msg})
-                    except Exception as e:
-                        failed += 1
-                        errors.append({"email": item["email"], "error": str(e)})
-
-                    # Progress update
-                    self.root.after(0, lambda c=i+1, t=len(payslip_list):
-                        self.progress_label.config(text=f"{c} / {t} emails opened..."))
+                # One sender for the whole batch (SMTP: connections reused across emails); stops between emails on cancel
+                results = sender.send_bulk(
+                    payslip_list,
+                    stop_event=stop_event,
+                    progress_callback=lambda c, t: self.progress.status(f"{c} / {t} emails {done_verb}...")
+                )
+            except Exception as e:
+                results["errors"].append({"email": "-", "error": str(e)})
             finally:
                 # ← ALWAYS runs (cancel, crash, or complete)
-                self.root.after(0, lambda: _finalize(success, failed, errors))
+                self.progress.call(_finalize, results["success"], results["failed"], results["errors"])
 
         # --- Nested Helper: Finalizer ---
         def _finalize(success, failed, errors):
@@ -406,7 +477,7 @@ class App:
             self.send_all_btn.config(text="Send All Emails", state="normal")
             self.progress_label.config(text="_")
 
-            msg = f"Opened: {success}\nFailed: {failed}"
+            msg = f"{done_verb.title()}: {success}\nFailed: {failed}"
             if errors:
                 msg += "\n\nErrors:\n" + "\n".join([f"{e['email']}: {e['error']}" for e in errors[:5]])
             messagebox.showinfo("Email Summary", msg, parent=self.root)
@@ -429,19 +500,35 @@ class App:
             messagebox.showwarning("No Emails", "No payslips with valid email addresses found.", parent=self.root)
             return
 
-        if not messagebox.askyesno(
-            "Confirm Send",
-            f"Open {len(payslip_list)} Thunderbird compose windows?",
-            parent=self.root
-        ):
+        try:
+            self.config = self.config_manager.load()
+        except ConfigError as e:
+            messagebox.showerror("Invalid Settings", str(e), parent=self.root)
+            return
+
+        backend = self.config["MAIL_BACKEND"]
+        done_verb = {"smtp": "sent", "export": "exported"}.get(backend, "opened")
+        confirm_text = {
+            "smtp"  : f"Send {len(payslip_list)} emails via {self.config['SMTP_HOST']}?",
+            "export": f"Export {len(payslip_list)} emails to {self.config['MAIL_EXPORT_FOLDER']}?",
+        }.get(backend, f"Open {len(payslip_list)} Thunderbird compose windows?")
+
+        if not messagebox.askyesno("Confirm Send", confirm_text, parent=self.root):
+            return
+
+        try:
+            from src.services.mailing import make_email_sender
+            sender = make_email_sender(self.config)
+        except Exception as e:
+            messagebox.showerror("Email Failed", str(e), parent=self.root)
             return
 
         self.batch_mailing_inprog = True
         self.mailing_stop_event.clear()
         self.send_all_btn.config(text="Cancel Mailing", state="normal")
-        self.progress_label.config(text=f"0 / {len(payslip_list)} emails opened...")
+        self.progress_label.config(text=f"0 / {len(payslip_list)} emails {done_verb}...")
 
-        Thread(target=_worker, args=(payslip_list, self.mailing_stop_event), daemon=True).start()
+        Thread(target=_worker, args=(payslip_list, self.mailing_stop_event, sender), daemon=True).start()
 
 # --------------------------
 # Entry point
@@ -0,0 +1,68 @@
+"""
+Worker threads -> Tk main thread messages. Workers only put into a queue; the UI drains it
+at a fixed interval, so a burst of thousands of payslips costs one label refresh and one bulk
+list insert per tick instead of a Tk event (and widget update) per payslip.
+"""
+
+import logging
+import queue
+
+
+class ProgressChannel:
+    def __init__(self, root, on_items, on_status, interval_ms=100):
+        """
+        on_items(list):  called on the Tk thread with every item posted since the last tick, in order
+        on_status(text): called on the Tk thread with the latest status text of the tick
+        """
+        self.root      = root
+        self.on_items  = on_items
+        self.on_status = on_status
+        self.interval_ms = interval_ms
+        self.queue     = queue.SimpleQueue()
+        self.root.after(self.interval_ms, self._poll)
+
+    # --- any thread ---
+    def item(self, item):
+        self.queue.put(("item", item))
+
+    def status(self, text):
+        self.queue.put(("status", text))
+
+    def call(self, fn, *args, **kwargs):
+        """Runs fn(*args, **kwargs) on the Tk thread, after the items and statuses posted before it."""
+        self.queue.put(("call", (fn, args, kwargs)))
+
+    # --- Tk thread ---
+    def _poll(self):
+        try:
+            self._drain()
+        except Exception as e:
+            logging.error(e, exc_info=True)
+        finally:
+            self.root.after(self.interval_ms, self._poll)
+
+    def _drain(self):
+        items, status = [], None
+
+        # Only what is queued now: producers faster than the UI can't keep this tick going forever
+        for _ in range(self.queue.qsize()):
+            kind, payload = self.queue.get_nowait()
+
+            if kind == "item":
+                items.append(payload)
+            elif kind == "status":
+                status = payload
+            else:
+                # Keep the order: whatever was posted before the call is shown first
+                self._flush(items, status)
+                items, status = [], None
+                fn, args, kwargs = payload
+                fn(*args, **kwargs)
+
+        self._flush(items, status)
+
+    def _flush(self, items, status):
+        if items:
+            self.on_items(items)
+        if status is not None:
+            self.on_status(status)
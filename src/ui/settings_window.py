@@ -5,9 +5,8 @@ Mousewheel works over all areas - scrollbar, labels, entries, buttons, empty spa
 import tkinter as tk
 from tkinter import filedialog, messagebox
 from pathlib import Path
-from src.config_manager import ConfigManager
+from src.config_manager import ConfigManager, ConfigError, CELL_REFERENCE
 import os
-from openpyxl import load_workbook
 
 
 class SettingsWindow(tk.Toplevel):
@@ -21,7 +20,7 @@ class SettingsWindow(tk.Toplevel):
         self.focus_force()
 
         self.config_manager = ConfigManager()
-        self.config = self.config_manager.load()
+        self.config = self.config_manager.load(validate=False)  # raw values: a bad setting must still be editable
         self.entries = {}
 
         self._create_scrollable_area()
@@ -119,7 +118,7 @@ class SettingsWindow(tk.Toplevel):
                 tk.Label(parent, text="").grid(row=row, column=2, padx=pad, pady=(pad, 0))
             else:
                 # Entry for string/path settings
-                entry = tk.Entry(parent, width=50)
+                entry = tk.Entry(parent, width=50, show="*" if key.endswith("PASSWORD") else "")
                 entry.grid(row=row, column=1, sticky="ew", padx=pad, pady=(pad, 0))
                 entry.insert(0, self.config[key])
                 self.entries[key] = entry
@@ -174,6 +173,7 @@ class SettingsWindow(tk.Toplevel):
     def _save(self):
         supported_spreadsheet_filetypes = ['.xlsx']
         new_config = {}
+        employee_sheet_headers = {}  # path -> {sheet name: row 1 values}, each workbook read once per save
 
         for key, entry in self.entries.items():
 
@@ -209,12 +209,10 @@ class SettingsWindow(tk.Toplevel):
 
                 try:
                     payslips_dir = Path(val)
-                    if payslips_dir.is_dir():
-                        continue
-
-                    payslips_dir.mkdir(parents=True, exist_ok=True)
-                    assert payslips_dir.is_dir(), "Folder creation using failed, do ot attempt to use punctation marks beyond '.' & '_'"
-                    messagebox.showinfo("New Directory Created", f"a new folder '{val}' has been created!", parent=self)
+                    if not payslips_dir.is_dir():
+                        payslips_dir.mkdir(parents=True, exist_ok=True)
+                        assert payslips_dir.is_dir(), "Folder creation using failed, do ot attempt to use punctation marks beyond '.' & '_'"
+                        messagebox.showinfo("New Directory Created", f"a new folder '{val}' has been created!", parent=self)
                 except PermissionError:
                     messagebox.showerror("Failed to create Directory", f"The app does not have the superuser permission to create the payslips folder '{val}',\nIt's better to try from {os.environ['HOME']}/your_chosen_folder_name", parent=self)
                     return
@@ -223,6 +221,7 @@ class SettingsWindow(tk.Toplevel):
                     return
             elif key.endswith("HEADER"):
                 if not val:
+                    new_config[key] = val
                     continue
                 employee_sheet_path = None
                 if "EMPLOYEE_SPREADSHEET_FILEPATH" in self.entries:
@@ -235,13 +234,15 @@ class SettingsWindow(tk.Toplevel):
                     return
 
                 try:
-                    wb = load_workbook(employee_sheet_path)
+                    if employee_sheet_path not in employee_sheet_headers:
+                        from src.services.employee_workbook import EmployeeWorkbook  # openpyxl: only when checking headers
+                        with EmployeeWorkbook(employee_sheet_path) as wb:
+                            employee_sheet_headers[employee_sheet_path] = {name: wb.header(name) for name in wb.sheetnames}
+
                     header_found_in_all_sheets = True
                     missing_sheets = []
 
-                    for sheet_name in wb.sheetnames:
-                        sheet = wb[sheet_name]
-                        row1_values = [str(cell.value).strip() for cell in sheet[1] if cell.value is not None]
+                    for sheet_name, row1_values in employee_sheet_headers[employee_sheet_path].items():
                         if val not in row1_values:
                             header_found_in_all_sheets = False
                             missing_sheets.append(sheet_name)
@@ -253,21 +254,16 @@ class SettingsWindow(tk.Toplevel):
                             parent=self
                         )
                         return
-                    wb.close()
                 except Exception as e:
                     messagebox.showerror("Error Validating Header", str(e), parent=self)
                     return
             elif key.endswith("CELL"):
                 if not val:
+                    new_config[key] = val
                     continue
-                try:
-                    template_path = self.entries["PAYSLIP_TEMPLATE_FILEPATH"].get()
-                    if template_path and Path(template_path).exists():
-                        load_workbook(template_path).active[val]
-                    else:
-                        load_workbook(self.config["PAYSLIP_TEMPLATE_FILEPATH"]).active[val]
-                except Exception as e:
-                    messagebox.showerror("Invalid Cell reference", f"\"{val}\" location in the template sheet could not be validated!\nError:\n{e}", parent=self)
+                val = val.upper()
+                if not CELL_REFERENCE.match(val):
+                    messagebox.showerror("Invalid Cell reference", f"\"{val}\" is not a cell of the template sheet, use references like B12", parent=self)
                     return
             elif key.endswith("ENABLED"):
                 try:
@@ -282,5 +278,7 @@ class SettingsWindow(tk.Toplevel):
             self.config_manager.save(new_config)
             self.destroy()
             messagebox.showinfo("Settings Saved", "Configuration updated successfully.", parent=self.master)
+        except ConfigError as e:
+            messagebox.showerror("Invalid Settings", str(e), parent=self)
         except Exception as e:
             messagebox.showerror("Error Saving", str(e), parent=self)